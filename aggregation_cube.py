@@ -0,0 +1,315 @@
+"""
+Project LOSight: Precomputed aggregation cube for grouped LOS statistics
+
+Every dashboard group-by runs over the same few low-cardinality dimensions,
+and Length of Stay takes only a small set of distinct values (whole days).
+The cube stores, for every occupied combination of dimension values, a
+histogram of LOS values: one sparse row per (cell, LOS value) with its count.
+A cell's count, sum and sum of squares are that histogram's moments, so any
+filtered group-by is answered by merging histograms, with exact medians and
+quantiles, at a cost that depends on the cube size instead of the row count.
+The same histograms give every summary statistic of a filtered selection
+(quantiles, moments, IQR bounds) in one pass; see histogram_summary().
+
+A rolled-up copy without the DRG dimension answers the (common) queries that
+neither filter nor group by DRG from far fewer cells.
+
+Cubes are additive: appended rows are counted in a cube of their own, which
+is merged into the existing one.
+"""
+
+import numpy as np
+import pandas as pd
+
+LOS_COLUMN = 'Length of Stay'
+
+# Age buckets used by the demographics panel
+AGE_BINS = [0, 30, 50, 70, 100]
+AGE_LABELS = ['18-29', '30-49', '50-69', '70+']
+
+# Cube dimension -> source column
+DIMENSION_COLUMNS = {
+    'severity': 'APR Severity of Illness Code',
+    'payment': 'Payment_Type',
+    'admission': 'Type of Admission',
+    'drg': 'APR DRG Code',
+    'age_group': 'Age_Numeric',
+    'gender': 'Gender',
+    'is_senior': 'Is_Senior',
+    'needs_snf': 'Needs_Skilled_Nursing',
+}
+
+# Dimensions that the dashboard filters on (see filter_index.FILTER_COLUMNS)
+FILTER_DIMENSIONS = ('severity', 'payment', 'admission', 'drg')
+
+# Above this many distinct LOS values the histograms stop being compact
+MAX_LOS_VALUES = 4096
+
+
+def dimension_series(df, name):
+    """Values of cube dimension name for the rows of df"""
+    values = df[DIMENSION_COLUMNS[name]]
+    if name == 'age_group':
+        values = pd.cut(values, bins=AGE_BINS, labels=AGE_LABELS, right=False)
+    return values.rename(name)
+
+
+def _encode(series):
+    """Integer codes (-1 for missing) and the sorted distinct values"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64), series.cat.categories
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype(np.int64), uniques
+
+
+def _value_at_rank(cum, ranks, values):
+    """Per group, the LOS value at 0-based rank in the merged histogram"""
+    idx = (cum > ranks[:, None]).argmax(axis=1)
+    return values[idx]
+
+
+def _quantiles(cum, n, qs, values):
+    """Linearly interpolated quantiles (pandas' default) per cumulative histogram row"""
+    out = []
+    for q in qs:
+        pos = q * (n - 1)
+        lo = np.floor(pos)
+        lo_v = _value_at_rank(cum, lo, values).astype(np.float64)
+        hi_v = _value_at_rank(cum, np.ceil(pos), values).astype(np.float64)
+        out.append(lo_v + (hi_v - lo_v) * (pos - lo))
+    return out
+
+
+def histogram_summary(values, counts, qs=()):
+    """
+    Statistics of the data described by one histogram (counts per distinct
+    value), matching pandas: count, mean, std (ddof=1), skew (adjusted
+    Fisher-Pearson), min, max and the linearly interpolated quantiles qs.
+    Statistics that are undefined for too few rows are NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    n = int(counts.sum())
+    nan = float('nan')
+    summary = {'count': n, 'mean': nan, 'std': nan, 'skew': nan, 'min': nan, 'max': nan,
+               'quantiles': [nan] * len(qs)}
+    if n == 0:
+        return summary
+    occupied = np.flatnonzero(counts)
+    summary['min'] = float(values[occupied[0]])
+    summary['max'] = float(values[occupied[-1]])
+    mean = float(counts @ values) / n
+    summary['mean'] = mean
+    cum = counts.cumsum()[None, :]
+    summary['quantiles'] = [float(q[0]) for q in _quantiles(cum, np.array([n]), qs, values)]
+
+    adjusted = values - mean
+    m2 = float(counts @ adjusted ** 2)
+    m3 = float(counts @ adjusted ** 3)
+    # Rounding noise around zero, as in pandas' nanops
+    m2 = 0.0 if abs(m2) < 1e-14 else m2
+    m3 = 0.0 if abs(m3) < 1e-14 else m3
+    if n >= 2:
+        summary['std'] = (m2 / (n - 1)) ** 0.5
+    if n >= 3:
+        summary['skew'] = 0.0 if m2 == 0 else n * (n - 1) ** 0.5 / (n - 2) * m3 / m2 ** 1.5
+    return summary
+
+
+class AggregationCube:
+    """Sparse (dimension cell, LOS value) -> count table"""
+
+    def __init__(self, dims, uniques, codes, los_values, los_codes, counts):
+        self.dims = list(dims)
+        self.uniques = uniques          # dim -> pd.Index of values
+        self.codes = codes              # dim -> int array per sparse row
+        self.los_values = los_values    # sorted distinct LOS values
+        self.los_codes = los_codes      # index into los_values per sparse row
+        self.counts = counts            # rows per (cell, LOS value)
+        self.lookup = {
+            dim: {value: code for code, value in enumerate(uniques[dim].tolist())}
+            for dim in self.dims
+        }
+
+    @classmethod
+    def build(cls, df):
+        """Build the cube over every dimension available in df"""
+        dims = [d for d, col in DIMENSION_COLUMNS.items() if col in df.columns]
+        los_codes, los_values = _encode(df[LOS_COLUMN])
+        if len(los_values) > MAX_LOS_VALUES:
+            raise ValueError(f'{len(los_values)} distinct LOS values exceed MAX_LOS_VALUES')
+        encoded = {dim: _encode(dimension_series(df, dim)) for dim in dims}
+        radices = [len(encoded[dim][1]) + 1 for dim in dims]
+        if np.prod([float(r) for r in radices]) * len(los_values) >= 2 ** 62:
+            raise ValueError('cube key space exceeds int64')
+        uniques = {}
+        key = np.zeros(len(df), dtype=np.int64)
+        for dim, radix in zip(dims, radices):
+            codes, values = encoded[dim]
+            uniques[dim] = pd.Index(values)
+            key = key * radix + (codes + 1)
+        key = key * len(los_values) + los_codes
+
+        cells, counts = np.unique(key, return_counts=True)
+        return cls._from_keys(dims, uniques, radices, los_values, cells, counts)
+
+    @classmethod
+    def _from_keys(cls, dims, uniques, radices, los_values, keys, counts):
+        n_los = len(los_values)
+        los_codes = keys % n_los
+        keys = keys // n_los
+        codes = {}
+        for dim, radix in zip(reversed(dims), reversed(radices)):
+            codes[dim] = (keys % radix - 1).astype(np.int32)
+            keys = keys // radix
+        return cls(dims, uniques, codes, np.asarray(los_values), los_codes.astype(np.int32),
+                   counts.astype(np.int64))
+
+    def _keys(self, uniques, radices, los_values):
+        """Sparse row keys of this cube in the key space of a merged cube"""
+        key = np.zeros(len(self.counts), dtype=np.int64)
+        for dim, radix in zip(self.dims, radices):
+            remap = np.append(uniques[dim].get_indexer(self.uniques[dim]), -1)
+            key = key * radix + (remap[self.codes[dim]] + 1)
+        los_remap = np.searchsorted(los_values, self.los_values)
+        return key * len(los_values) + los_remap[self.los_codes]
+
+    def merge(self, other):
+        """Cube counting the rows of both cubes, which have the same dimensions"""
+        if self.dims != other.dims:
+            raise ValueError('cannot merge cubes with different dimensions')
+        uniques = {dim: self.uniques[dim].union(other.uniques[dim]) for dim in self.dims}
+        los_values = np.union1d(self.los_values, other.los_values)
+        if len(los_values) > MAX_LOS_VALUES:
+            raise ValueError(f'{len(los_values)} distinct LOS values exceed MAX_LOS_VALUES')
+        radices = [len(uniques[dim]) + 1 for dim in self.dims]
+        if np.prod([float(r) for r in radices]) * len(los_values) >= 2 ** 62:
+            raise ValueError('cube key space exceeds int64')
+        keys = np.concatenate([cube._keys(uniques, radices, los_values) for cube in (self, other)])
+        cells, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, other.counts])).astype(np.int64)
+        return AggregationCube._from_keys(self.dims, uniques, radices, los_values, cells, counts)
+
+    def rollup(self, drop):
+        """Cube with the dimensions in drop summed out"""
+        dims = [d for d in self.dims if d not in drop]
+        radices = [len(self.uniques[d]) + 1 for d in dims]
+        key = np.zeros(len(self.counts), dtype=np.int64)
+        for dim, radix in zip(dims, radices):
+            key = key * radix + (self.codes[dim] + 1)
+        key = key * len(self.los_values) + self.los_codes
+        cells, inverse = np.unique(key, return_inverse=True)
+        counts = np.bincount(inverse, weights=self.counts).astype(np.int64)
+        uniques = {d: self.uniques[d] for d in dims}
+        return AggregationCube._from_keys(dims, uniques, radices, self.los_values, cells, counts)
+
+    @property
+    def n_cells(self):
+        return len(self.counts)
+
+    def supports(self, dims):
+        return all(d in self.uniques for d in dims)
+
+    def _mask(self, filters):
+        """Sparse rows matching the canonical filters (None = all rows)"""
+        mask = None
+        for dim in FILTER_DIMENSIONS:
+            value = filters.get(dim)
+            if value is None or dim not in self.lookup:
+                continue
+            if isinstance(value, tuple):
+                # Any of several values
+                hit = np.isin(self.codes[dim], [self.lookup[dim].get(v, -2) for v in value])
+            else:
+                hit = self.codes[dim] == self.lookup[dim].get(value, -2)
+            mask = hit if mask is None else mask & hit
+        if filters.get('los_min') is not None and filters.get('los_max') is not None:
+            los = self.los_values[self.los_codes]
+            hit = (los >= filters['los_min']) & (los <= filters['los_max'])
+            mask = hit if mask is None else mask & hit
+        return mask
+
+    def histograms(self, by, filters):
+        """
+        Merged LOS histograms per group of the dimensions in by.
+        Returns (group key arrays per dim, counts matrix of groups × LOS values);
+        groups with a missing key value or no rows are dropped, as in pandas.
+        """
+        mask = self._mask(filters)
+        keep = mask if mask is not None else np.ones(len(self.counts), dtype=bool)
+        for dim in by:
+            keep = keep & (self.codes[dim] >= 0)
+        radices = [len(self.uniques[d]) for d in by]
+        group = np.zeros(int(keep.sum()), dtype=np.int64)
+        for dim, radix in zip(by, radices):
+            group = group * radix + self.codes[dim][keep]
+        n_groups = int(np.prod(radices)) if by else 1
+        n_los = len(self.los_values)
+        hist = np.bincount(
+            group * n_los + self.los_codes[keep],
+            weights=self.counts[keep],
+            minlength=n_groups * n_los,
+        ).reshape(n_groups, n_los)
+
+        occupied = np.flatnonzero(hist.sum(axis=1))
+        keys = {}
+        remainder = occupied
+        for dim, radix in zip(reversed(by), reversed(radices)):
+            keys[dim] = self.uniques[dim].take(remainder % radix)
+            remainder = remainder // radix
+        return keys, hist[occupied]
+
+    def group_stats(self, by, filters):
+        """
+        DataFrame with the by dimensions followed by median, mean and count of
+        LOS per group, sorted by the group keys like DataFrame.groupby().
+        """
+        keys, hist = self.histograms(by, filters)
+        count = hist.sum(axis=1)
+        total = hist @ self.los_values.astype(np.float64)
+        n = count.astype(np.float64)
+        cum = hist.cumsum(axis=1)
+        median = (
+            _value_at_rank(cum, (count - 1) // 2, self.los_values).astype(np.float64)
+            + _value_at_rank(cum, count // 2, self.los_values).astype(np.float64)
+        ) / 2
+        result = pd.DataFrame({dim: keys[dim] for dim in by})
+        result['median'] = median
+        result['mean'] = total / n
+        result['count'] = count.astype(np.int64)
+        return result
+
+
+class CubeSet:
+    """The full cube plus a DRG roll-up; queries use the smallest that fits"""
+
+    def __init__(self, full):
+        self.cubes = [full]
+        if 'drg' in full.dims:
+            self.cubes.insert(0, full.rollup(['drg']))
+
+    @classmethod
+    def build(cls, df):
+        return cls(AggregationCube.build(df))
+
+    def appended(self, delta):
+        """Cubes over the rows counted here plus the rows of delta"""
+        return CubeSet(self.cubes[-1].merge(AggregationCube.build(delta)))
+
+    def for_query(self, by, filters):
+        """Smallest cube that can group by `by` and apply `filters`, or None"""
+        needed = list(by) + [d for d in FILTER_DIMENSIONS if filters.get(d) is not None]
+        for cube in self.cubes:
+            if cube.supports(needed):
+                return cube
+        return None
+
+    def group_stats(self, by, filters):
+        cube = self.for_query(by, filters)
+        if cube is None:
+            return None
+        return cube.group_stats(by, filters)
+
+    @property
+    def n_cells(self):
+        return [cube.n_cells for cube in self.cubes]
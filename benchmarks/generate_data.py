@@ -0,0 +1,155 @@
+"""
+Project LOSight: Synthetic dataset generator
+
+Writes a CSV with the columns of hospital_data_clean_base_all_drgs.csv and
+realistic cardinalities and skew: a few hundred DRG codes with Zipf-like
+volumes, LOS that is log-normal and grows with severity and DRG, risk of
+mortality correlated with severity, payment type and disposition that depend
+on age, and a small share of missing values and zero-day stays.
+
+    python benchmarks/generate_data.py 1.9M data/hospital_data_clean_base_all_drgs.csv
+
+Rows are generated and written in chunks, so 10M-row files need little
+memory. The same size and seed always give the same file.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 500_000
+N_DRGS = 330
+
+COUNTIES = [
+    'Albany', 'Allegany', 'Bronx', 'Broome', 'Cattaraugus', 'Cayuga', 'Chautauqua', 'Chemung',
+    'Chenango', 'Clinton', 'Columbia', 'Cortland', 'Delaware', 'Dutchess', 'Erie', 'Essex',
+    'Franklin', 'Fulton', 'Genesee', 'Greene', 'Hamilton', 'Herkimer', 'Jefferson', 'Kings',
+    'Lewis', 'Livingston', 'Madison', 'Monroe', 'Montgomery', 'Nassau', 'New York', 'Niagara',
+    'Oneida', 'Onondaga', 'Ontario', 'Orange', 'Orleans', 'Oswego', 'Otsego', 'Putnam', 'Queens',
+    'Rensselaer', 'Richmond', 'Rockland', 'St Lawrence', 'Saratoga', 'Schenectady', 'Schoharie',
+    'Schuyler', 'Seneca', 'Steuben', 'Suffolk', 'Sullivan', 'Tioga', 'Tompkins', 'Ulster',
+    'Warren', 'Washington', 'Wayne', 'Westchester', 'Wyoming', 'Yates',
+]
+AGE_GROUPS = (['0-17', '18-29', '30-49', '50-69', '70 or Older'], [0.10, 0.12, 0.20, 0.28, 0.30])
+GENDERS = (['F', 'M', 'U'], [0.5295, 0.47, 0.0005])
+ADMISSIONS = (
+    ['Emergency', 'Elective', 'Urgent', 'Newborn', 'Trauma', 'Not Available'],
+    [0.68, 0.16, 0.09, 0.06, 0.005, 0.005],
+)
+SEVERITIES = ([1, 2, 3, 4], [0.30, 0.40, 0.23, 0.07])
+RISKS = ['Minor', 'Moderate', 'Major', 'Extreme']
+PAYMENTS = ['Medicare', 'Medicaid', 'Private Health Insurance', 'Blue Cross/Blue Shield',
+            'Managed Care, Unspecified', 'Self-Pay', 'Federal/State/Local/VA',
+            'Miscellaneous/Other', 'Unknown']
+# Payment type probabilities for patients under / over 70
+PAYMENT_P = (
+    [0.08, 0.38, 0.24, 0.13, 0.07, 0.04, 0.03, 0.02, 0.01],
+    [0.72, 0.08, 0.07, 0.05, 0.04, 0.01, 0.01, 0.01, 0.01],
+)
+DISPOSITIONS = ['Home or Self Care', 'Home w/ Home Health Services', 'Skilled Nursing Home',
+                'Inpatient Rehabilitation Facility', 'Short-term Hospital', 'Hospice - Medical Facility',
+                'Expired', 'Left Against Medical Advice', 'Another Type Not Listed']
+DISPOSITION_P = (
+    [0.72, 0.12, 0.04, 0.02, 0.03, 0.01, 0.01, 0.03, 0.02],
+    [0.42, 0.22, 0.18, 0.06, 0.03, 0.03, 0.04, 0.01, 0.01],
+)
+
+
+def parse_size(text):
+    """Row count from '100000', '100k', '1.9M' or '10m'"""
+    text = text.strip().lower().replace('_', '').replace(',', '')
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    if factor > 1:
+        text = text[:-1]
+    return int(float(text) * factor)
+
+
+def _choice(rng, options, n):
+    values, p = options
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p)]
+
+
+def _by_senior(rng, values, p_pair, senior):
+    """Draw values with one probability vector for non-seniors, another for seniors"""
+    out = np.empty(len(senior), dtype=object)
+    for flag, p in zip((False, True), p_pair):
+        mask = senior == flag
+        out[mask] = np.asarray(values, dtype=object)[rng.choice(len(values), size=int(mask.sum()), p=p)]
+    return out
+
+
+def _drg_table(rng):
+    """DRG codes with Zipf-like volume weights and a typical log-LOS per code"""
+    codes = np.sort(rng.choice(np.arange(1, 957), size=N_DRGS, replace=False))
+    weights = 1.0 / np.arange(1, N_DRGS + 1) ** 1.1
+    weights = rng.permutation(weights)
+    base = np.log(rng.uniform(2.0, 9.0, size=N_DRGS))
+    return codes, weights / weights.sum(), base
+
+
+def generate_chunk(rng, n, drgs):
+    codes, weights, base = drgs
+    admission = _choice(rng, ADMISSIONS, n)
+    age = _choice(rng, AGE_GROUPS, n)
+    age[admission == 'Newborn'] = '0-17'
+    senior = age == '70 or Older'
+    severity = _choice(rng, SEVERITIES, n).astype(np.int64)
+    risk_level = np.clip(severity + rng.choice([-1, 0, 0, 1], size=n) - 1, 0, 3)
+    risk = np.asarray(RISKS, dtype=object)[risk_level]
+    drg = rng.choice(N_DRGS, size=n, p=weights)
+
+    mu = base[drg] + 0.35 * (severity - 1) + 0.12 * senior - 0.4
+    los = np.clip(np.round(rng.lognormal(mu, 0.7)), 1, 120).astype(np.int64)
+    los[rng.random(n) < 0.0005] = 0
+
+    frame = pd.DataFrame({
+        'Hospital County': np.asarray(COUNTIES, dtype=object)[
+            np.minimum(rng.zipf(1.3, size=n) - 1, len(COUNTIES) - 1)],
+        'Age Group': age,
+        'Gender': _choice(rng, GENDERS, n),
+        'Type of Admission': admission,
+        'Patient Disposition': _by_senior(rng, DISPOSITIONS, DISPOSITION_P, senior),
+        'APR DRG Code': codes[drg],
+        'APR Severity of Illness Code': severity,
+        'APR Risk of Mortality': risk,
+        'Payment_Type': _by_senior(rng, PAYMENTS, PAYMENT_P, senior),
+        'Length of Stay': los,
+        'Total Charges': np.round(5000 + los * rng.gamma(2.0, 3000.0, size=n), 2),
+    })
+    frame.loc[rng.random(n) < 0.001, 'APR Risk of Mortality'] = np.nan
+    frame.loc[rng.random(n) < 0.002, 'Payment_Type'] = np.nan
+    return frame
+
+
+def generate(path, rows, seed=0, log=print):
+    """Write a synthetic dataset of rows rows to path"""
+    rng = np.random.default_rng(seed)
+    drgs = _drg_table(rng)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    started = time.monotonic()
+    written = 0
+    with open(path, 'w', newline='') as f:
+        while written < rows:
+            n = min(CHUNK_ROWS, rows - written)
+            generate_chunk(rng, n, drgs).to_csv(f, index=False, header=written == 0)
+            written += n
+            log(f"  Generated {written:,} / {rows:,} rows")
+    log(f"✓ Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {time.monotonic() - started:.1f}s")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('rows', help="number of rows, e.g. 100k, 1.9M, 10M")
+    parser.add_argument('output', help="CSV file to write")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    generate(args.output, parse_size(args.rows), seed=args.seed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
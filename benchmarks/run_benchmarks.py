@@ -0,0 +1,270 @@
+"""
+Project LOSight: Benchmark harness
+
+Measures one dataset end to end and writes the results as JSON:
+
+- load_data() wall time and peak RSS, cold (CSV parsed, dataset cache
+  written) and warm (from the dataset cache), each in a fresh subprocess
+- create_features() time on the cleaned CSV frame, also in a subprocess
+- latency percentiles and throughput of every /api/data/* route over a matrix
+  of filter combinations, through the Flask test client with the result
+  cache disabled (--result-cache keeps it on)
+
+    python benchmarks/run_benchmarks.py --rows 1.9M
+    python benchmarks/run_benchmarks.py --csv data.csv --compare benchmarks/results/before.json
+
+With --rows the synthetic dataset from generate_data.py is created (once) in
+benchmarks/data/. --compare prints the change against an earlier result file
+and exits with status 1 when anything got slower than --threshold allows.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from generate_data import generate, parse_size  # noqa: E402
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _phase_load():
+    import server
+    started = time.perf_counter()
+    data = server.load_data()
+    return {
+        'seconds': round(time.perf_counter() - started, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'rows': len(data),
+        'columns': len(data.columns),
+        'memory_mb': round(data.memory_usage(index=False, deep=True).sum() / 1e6, 1),
+    }
+
+
+def _phase_features():
+    import pandas as pd
+    import server
+    data = pd.read_csv(os.environ['LOSIGHT_CSV_PATH'], low_memory=False)
+    data = data[data['Length of Stay'] > 0].reset_index(drop=True)
+    started = time.perf_counter()
+    timings = server.create_features(data)
+    return {'seconds': round(time.perf_counter() - started, 3), 'per_feature': timings}
+
+
+PHASES = {'load': _phase_load, 'features': _phase_features}
+
+
+def run_phase(phase, csv_path, cache_dir):
+    """Run a phase in a fresh interpreter so its timing and peak RSS are its own"""
+    env = dict(os.environ, LOSIGHT_CSV_PATH=os.path.abspath(csv_path), LOSIGHT_CACHE_DIR=cache_dir,
+               LOSIGHT_WARMUP_SECONDS='0')
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--phase', phase],
+        env=env, cwd=REPO_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{phase} phase failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def filter_matrix(options):
+    """Named filter query strings built from /api/filters/options"""
+    def pick(name, preferred):
+        values = options.get(name) or []
+        if preferred in values:
+            return preferred
+        return values[len(values) // 2] if values else None
+
+    single = {
+        'severity': pick('severity', 3),
+        'payment': pick('payment', 'Medicare'),
+        'admission': pick('admission', 'Emergency'),
+        'drg': pick('drg', None),
+    }
+    matrix = {'unfiltered': {}}
+    for name, value in single.items():
+        if value is not None:
+            matrix[name] = {name: value}
+    matrix['los_range'] = {'los_min': 3, 'los_max': 10}
+    matrix['severity+payment'] = {k: single[k] for k in ('severity', 'payment') if single[k] is not None}
+    matrix['admission+drg'] = {k: single[k] for k in ('admission', 'drg') if single[k] is not None}
+    matrix['all'] = dict({k: v for k, v in single.items() if v is not None}, los_min=3, los_max=10)
+    return matrix
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3)
+
+
+def bench_endpoints(csv_path, cache_dir, repeat, result_cache, log=print):
+    """Latency and throughput of every /api/data/* route per filter combination"""
+    from urllib.parse import urlencode
+    os.environ['LOSIGHT_CSV_PATH'] = os.path.abspath(csv_path)
+    os.environ['LOSIGHT_CACHE_DIR'] = cache_dir
+    # Measure the endpoints themselves, not results warmed in the background
+    os.environ['LOSIGHT_WARMUP_SECONDS'] = '0'
+    import server
+    server.load_data()
+    if not result_cache:
+        server.result_cache.max_bytes = 0
+    client = server.app.test_client()
+    options = client.get('/api/filters/options').get_json()
+    routes = sorted(rule.rule for rule in server.app.url_map.iter_rules()
+                    if rule.rule.startswith('/api/data/') and 'GET' in rule.methods)
+
+    results = []
+    for name, filters in filter_matrix(options).items():
+        query = urlencode(filters)
+        for route in routes:
+            url = f"{route}?{server.DASHBOARD_PARAMS}{'&' + query if query else ''}"
+            response = client.get(url)  # warm-up
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+            times = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                client.get(url)
+                times.append(time.perf_counter() - started)
+            results.append({
+                'route': route,
+                'filters': name,
+                'query': query,
+                'p50_ms': _percentile(times, 50),
+                'p90_ms': _percentile(times, 90),
+                'p99_ms': _percentile(times, 99),
+                'mean_ms': round(sum(times) / len(times) * 1000, 3),
+                'throughput_rps': round(len(times) / sum(times), 1),
+                'response_bytes': len(response.data),
+            })
+            log(f"  {route:<32} {name:<18} p50 {results[-1]['p50_ms']:8.2f} ms")
+    return results
+
+
+def metadata(csv_path):
+    import pandas as pd
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'csv': os.path.abspath(csv_path),
+        'csv_bytes': os.path.getsize(csv_path),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(previous, current, threshold):
+    """Print timing ratios current / previous; return the regressions"""
+    regressions = []
+
+    def check(label, old, new):
+        if not old or new is None:
+            return
+        ratio = new / old
+        flag = '✗' if ratio > threshold else '✓'
+        print(f"{flag} {label:<60} {old:10.3f} → {new:10.3f} ({ratio:.2f}×)")
+        if ratio > threshold:
+            regressions.append(label)
+
+    for phase in ('load_cold', 'load_warm', 'features'):
+        if phase in previous and phase in current:
+            check(f'{phase} seconds', previous[phase]['seconds'], current[phase]['seconds'])
+    old_endpoints = {(e['route'], e['filters']): e for e in previous.get('endpoints', [])}
+    for entry in current.get('endpoints', []):
+        old = old_endpoints.get((entry['route'], entry['filters']))
+        if old:
+            check(f"{entry['route']} [{entry['filters']}] p50 ms", old['p50_ms'], entry['p50_ms'])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--csv', help="dataset to benchmark")
+    source.add_argument('--rows', help="generate a synthetic dataset of this size (e.g. 100k, 1.9M, 10M)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for --rows")
+    parser.add_argument('--repeat', type=int, default=20, help="timed requests per route and filter set")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="slowdown ratio reported as a regression (default 1.2)")
+    parser.add_argument('--result-cache', action='store_true', help="keep the result cache enabled")
+    parser.add_argument('--skip', action='append', default=[], choices=['load', 'features', 'endpoints'],
+                        help="skip a part of the benchmark (repeatable)")
+    parser.add_argument('--phase', choices=sorted(PHASES), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.phase:
+        print(json.dumps(PHASES[args.phase]()))
+        return 0
+
+    csv_path = args.csv
+    if csv_path is None:
+        rows = parse_size(args.rows or '100k')
+        csv_path = os.path.join(BENCH_DIR, 'data', f'synthetic_{rows}_seed{args.seed}.csv')
+        if not os.path.exists(csv_path):
+            generate(csv_path, rows, seed=args.seed)
+
+    results = {'meta': metadata(csv_path)}
+    with tempfile.TemporaryDirectory(prefix='losight-bench-') as cache_dir:
+        if 'load' not in args.skip:
+            print("Measuring load_data() ...")
+            results['load_cold'] = run_phase('load', csv_path, cache_dir)
+            results['load_warm'] = run_phase('load', csv_path, cache_dir)
+            for phase in ('load_cold', 'load_warm'):
+                r = results[phase]
+                print(f"✓ {phase}: {r['seconds']:.2f}s, peak RSS {r['peak_rss_mb']} MB, {r['rows']:,} rows")
+        if 'features' not in args.skip:
+            print("Measuring create_features() ...")
+            results['features'] = run_phase('features', csv_path, cache_dir)
+            print(f"✓ create_features: {results['features']['seconds']:.2f}s")
+        if 'endpoints' not in args.skip:
+            print("Measuring /api/data/* endpoints ...")
+            results['endpoints'] = bench_endpoints(csv_path, cache_dir, args.repeat, args.result_cache)
+
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✓ Results written to: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare(previous, results, args.threshold)
+        if regressions:
+            print(f"✗ {len(regressions)} regression(s) above {args.threshold:.2f}×")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Project LOSight: Columnar on-disk cache of the prepared dataset
+
+The cleaned, feature-enriched frame is written once as one .npy file per
+column next to a small JSON manifest. Later boots load the columns back
+(memory-mapped by default) and skip CSV parsing and create_features().
+
+A cache entry is tied to the source CSV through its size, mtime and SHA-256
+and to FEATURE_SCHEMA_VERSION. Bump the version whenever the cleaning rules,
+create_features() or the row order change so existing caches are rebuilt.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Bump when cleaning, feature engineering or the row order changes the cached columns
+FEATURE_SCHEMA_VERSION = 5
+
+MANIFEST_NAME = 'manifest.json'
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in large blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_dir(cache_dir, csv_path):
+    """Cache directory used for a given source CSV"""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, stem)
+
+
+def _read_manifest(entry_dir):
+    try:
+        with open(os.path.join(entry_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(entry_dir, manifest):
+    """Replace the manifest of entry_dir atomically"""
+    path = os.path.join(entry_dir, MANIFEST_NAME)
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _is_fresh(manifest, csv_path, entry_dir):
+    """
+    Check a manifest against the current source CSV.
+    Size and mtime are compared first; the content hash is only recomputed
+    when the mtime differs (e.g. the same file was downloaded again), and the
+    new mtime is then recorded so later boots skip the hash.
+    """
+    if manifest is None or manifest.get('schema_version') != FEATURE_SCHEMA_VERSION:
+        return False
+    source = manifest.get('source', {})
+    stat = os.stat(csv_path)
+    if source.get('size') != stat.st_size:
+        return False
+    if source.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if source.get('sha256') != file_sha256(csv_path):
+        return False
+    source['mtime_ns'] = stat.st_mtime_ns
+    try:
+        _write_manifest(entry_dir, manifest)
+    except OSError as e:
+        print(f"✗ Could not update dataset cache manifest: {e}")
+    return True
+
+
+def _source_sha256(csv_path, stat, previous):
+    """SHA-256 of csv_path, taken from the previous manifest when size and mtime are unchanged"""
+    source = (previous or {}).get('source', {})
+    if source.get('sha256') and source.get('size') == stat.st_size and source.get('mtime_ns') == stat.st_mtime_ns:
+        return source['sha256']
+    return file_sha256(csv_path)
+
+
+def _save_column(series, path_prefix):
+    """Write one column and return its manifest entry"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        np.save(path_prefix + '.npy', series.cat.codes.to_numpy())
+        return {
+            'kind': 'categorical',
+            'categories': categories.tolist(),
+            'categories_dtype': str(categories.dtype),
+            'ordered': bool(series.cat.ordered),
+        }
+    if series.dtype.kind in 'biuf':
+        np.save(path_prefix + '.npy', series.to_numpy())
+        return {'kind': 'numeric'}
+    # Strings and other objects are dictionary-encoded and decoded on load
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    np.save(path_prefix + '.npy', codes)
+    return {
+        'kind': 'encoded',
+        'uniques': uniques.tolist(),
+        'dtype': str(series.dtype),
+    }
+
+
+def _load_column(entry, path, mmap):
+    values = np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+    if mmap:
+        values = values.view(np.ndarray)
+    kind = entry['kind']
+    if kind == 'numeric':
+        return values
+    if kind == 'categorical':
+        categories = pd.Index(entry['categories'], dtype=entry['categories_dtype'])
+        return pd.Categorical.from_codes(
+            values, dtype=pd.CategoricalDtype(categories, ordered=entry['ordered'])
+        )
+    # 'encoded': rebuild the original string column from its dictionary
+    uniques = np.array(entry['uniques'] + [np.nan], dtype=object)
+    return pd.array(uniques.take(values), dtype=entry['dtype'])
+
+
+def load_cached_frame(csv_path, cache_dir, mmap=True):
+    """
+    Return the cached frame for csv_path, or None if there is no fresh entry.
+    With mmap=True numeric columns stay backed by the .npy files on disk.
+    """
+    entry_dir = _entry_dir(cache_dir, csv_path)
+    manifest = _read_manifest(entry_dir)
+    try:
+        if not _is_fresh(manifest, csv_path, entry_dir):
+            return None
+        columns = {}
+        for i, entry in enumerate(manifest['columns']):
+            path = os.path.join(entry_dir, f'{i:03d}.npy')
+            columns[entry['name']] = _load_column(entry, path, mmap)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"✗ Ignoring unreadable dataset cache: {e}")
+        return None
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_cached_metadata(csv_path, cache_dir):
+    """Metadata stored alongside the cache entry for csv_path (or {})"""
+    manifest = _read_manifest(_entry_dir(cache_dir, csv_path))
+    if manifest is None:
+        return {}
+    return manifest.get('metadata', {})
+
+
+def manifest_mtime(csv_path, cache_dir):
+    """Modification time (ns) of the cache manifest for csv_path, or None"""
+    try:
+        return os.stat(os.path.join(_entry_dir(cache_dir, csv_path), MANIFEST_NAME)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def save_cached_frame(df, csv_path, cache_dir, metadata=None):
+    """
+    Write df as the cache entry for csv_path.
+    metadata is any JSON-serializable dict kept in the manifest.
+    Columns are written into a scratch directory that replaces the previous
+    entry only once complete, so a crash never leaves a half-written cache.
+    """
+    entry_dir = _entry_dir(cache_dir, csv_path)
+    scratch_dir = f'{entry_dir}.tmp-{os.getpid()}'
+    stat = os.stat(csv_path)
+    manifest = {
+        'schema_version': FEATURE_SCHEMA_VERSION,
+        'source': {
+            'path': os.path.abspath(csv_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': _source_sha256(csv_path, stat, _read_manifest(entry_dir)),
+        },
+        'rows': len(df),
+        'metadata': metadata or {},
+        'columns': [],
+    }
+
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    os.makedirs(scratch_dir)
+    try:
+        for i, name in enumerate(df.columns):
+            entry = _save_column(df[name], os.path.join(scratch_dir, f'{i:03d}'))
+            entry['name'] = name
+            manifest['columns'].append(entry)
+        _write_manifest(scratch_dir, manifest)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(scratch_dir, entry_dir)
+    except BaseException:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        raise
+    return entry_dir
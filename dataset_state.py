@@ -0,0 +1,235 @@
+"""
+Project LOSight: Versioned dataset state, hot reload and incremental append
+
+DatasetState bundles everything derived from one version of the dataset (the
+frame, filter index, aggregation cube, prediction model and its version
+hash). The server swaps the whole bundle at once, so a reload never exposes
+a half-built dataset, and each request keeps the state it started with.
+
+Appending a delta CSV reuses the existing state instead of rebuilding it:
+
+- DRGStats keeps a LOS histogram per DRG code, so the dataset-wide DRG_freq
+  and DRG_Median_LOS features are updated by adding the delta's histograms
+- append_frame() concatenates the columns, merging category dictionaries
+- the filter index and aggregation cube merge the delta's rows into their
+  existing structures (see FilterIndex.appended() and CubeSet.appended())
+
+ReloadWorker runs reloads and appends one at a time on a background thread;
+SourceWatcher polls the source files and asks for a reload when they change.
+"""
+
+import datetime
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+LOS_COLUMN = 'Length of Stay'
+DRG_COLUMN = 'APR DRG Code'
+
+
+class DatasetState:
+    """One loaded version of the dataset and the structures built from it"""
+
+    def __init__(self, df, csv_file, filter_index, cubes, model, version, signature,
+                 dtype_report=None, feature_timings=None, timings=None, deltas=(), drg_stats=None):
+        self.df = df
+        self.csv_file = csv_file
+        self.filter_index = filter_index
+        self.cubes = cubes                      # None when the cube is disabled
+        self.model = model                      # None when the model is disabled
+        self.version = version
+        self.signature = signature              # source files as seen by SourceWatcher
+        self.dtype_report = dtype_report
+        self.feature_timings = feature_timings
+        self.timings = dict(timings or {})      # seconds per load phase
+        self.deltas = list(deltas)              # delta CSVs appended to csv_file
+        self.loaded_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        self._drg_stats = drg_stats
+
+    def drg_stats(self):
+        """DRGStats of the dataset, built on first use (None without DRG codes)"""
+        if self._drg_stats is None and DRG_COLUMN in self.df.columns:
+            self._drg_stats = DRGStats.from_frame(self.df)
+        return self._drg_stats
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'rows': len(self.df),
+            'csv': self.csv_file,
+            'deltas': self.deltas,
+            'loaded_at': self.loaded_at,
+            'timings': self.timings,
+        }
+
+
+class DRGStats:
+    """LOS histogram per DRG code; DRG_freq and DRG_Median_LOS are read off it"""
+
+    def __init__(self, codes, los_values, counts):
+        self.codes = pd.Index(codes)            # distinct DRG codes
+        self.los_values = los_values            # sorted distinct LOS values
+        self.counts = counts                    # codes × LOS values
+
+    @classmethod
+    def from_frame(cls, df):
+        drg_codes, codes = pd.factorize(df[DRG_COLUMN], sort=True)
+        los_codes, los_values = pd.factorize(df[LOS_COLUMN], sort=True)
+        keep = (drg_codes >= 0) & (los_codes >= 0)
+        n_los = len(los_values)
+        counts = np.bincount(drg_codes[keep] * n_los + los_codes[keep],
+                             minlength=len(codes) * n_los).reshape(len(codes), n_los)
+        return cls(codes, np.asarray(los_values), counts)
+
+    def merge(self, other):
+        """Histograms of the rows of both"""
+        codes = self.codes.union(other.codes)
+        los_values = np.union1d(self.los_values, other.los_values)
+        counts = np.zeros((len(codes), len(los_values)), dtype=np.int64)
+        for stats in (self, other):
+            rows = codes.get_indexer(stats.codes)
+            cols = np.searchsorted(los_values, stats.los_values)
+            counts[np.ix_(rows, cols)] += stats.counts
+        return DRGStats(codes, los_values, counts)
+
+    def assign(self, df):
+        """Set df's DRG_freq and DRG_Median_LOS columns from these histograms"""
+        freq = self.counts.sum(axis=1)
+        cum = self.counts.cumsum(axis=1)
+        low = self.los_values[(cum > ((freq - 1) // 2)[:, None]).argmax(axis=1)]
+        high = self.los_values[(cum > (freq // 2)[:, None]).argmax(axis=1)]
+        median = (low.astype(np.float64) + high.astype(np.float64)) / 2
+        rows = self.codes.get_indexer(df[DRG_COLUMN])
+        if (rows < 0).any():
+            # Rows without a (known) DRG code get NaN, as with Series.map
+            freq = np.append(freq.astype(np.float64), np.nan)
+            median = np.append(median, np.nan)
+        df['DRG_freq'] = freq[rows]
+        df['DRG_Median_LOS'] = median[rows]
+
+
+def append_frame(base, delta):
+    """
+    Rows of delta appended to those of base, with base's columns (which delta
+    must all have). Categorical columns get the sorted union of both category
+    sets; other columns are concatenated with a common dtype.
+    """
+    missing = [col for col in base.columns if col not in delta.columns]
+    if missing:
+        raise ValueError(f"delta lacks columns: {', '.join(missing)}")
+    columns = {}
+    for col in base.columns:
+        old, new = base[col], delta[col]
+        if isinstance(old.dtype, pd.CategoricalDtype) or isinstance(new.dtype, pd.CategoricalDtype):
+            try:
+                columns[col] = union_categoricals(
+                    [old.astype('category'), new.astype('category')], sort_categories=True)
+                continue
+            except TypeError:
+                # Category values of different types
+                old, new = old.astype(object), new.astype(object)
+        if old.dtype.kind in 'biuf' and new.dtype.kind in 'biuf':
+            columns[col] = np.concatenate([old.to_numpy(), new.to_numpy()])
+        else:
+            columns[col] = pd.concat([old, new], ignore_index=True)
+    return pd.DataFrame(columns, copy=False)
+
+
+class ReloadWorker:
+    """
+    Runs dataset jobs (reloads, appends) one at a time on a daemon thread and
+    keeps the status of the most recent ones.
+    """
+
+    def __init__(self, history=20):
+        self._queue = queue.Queue()
+        self._jobs = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._next_id = 1
+
+    def submit(self, kind, func, **details):
+        """Queue func() and return a copy of the new job's status"""
+        with self._lock:
+            job = {'id': self._next_id, 'kind': kind, 'status': 'queued', 'error': None,
+                   'submitted': time.time(), 'started': None, 'finished': None}
+            job.update(details)
+            self._next_id += 1
+            self._jobs.append(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='losight-reload', daemon=True)
+                self._thread.start()
+            self._queue.put((job, func))
+            return dict(job)
+
+    def busy(self):
+        """Whether a job is queued or running"""
+        with self._lock:
+            return any(job['status'] in ('queued', 'running') for job in self._jobs)
+
+    def jobs(self):
+        with self._lock:
+            return [dict(job) for job in self._jobs]
+
+    def _run(self):
+        while True:
+            job, func = self._queue.get()
+            with self._lock:
+                job['status'] = 'running'
+                job['started'] = time.time()
+            try:
+                func()
+                status, error = 'done', None
+            except Exception as e:
+                status, error = 'failed', f'{type(e).__name__}: {e}'
+                print(f"✗ Dataset {job['kind']} failed: {error}")
+                traceback.print_exc()
+            with self._lock:
+                job['status'] = status
+                job['error'] = error
+                job['finished'] = time.time()
+
+
+class SourceWatcher:
+    """
+    Polls current() every interval seconds and calls on_change() when it
+    differs from expected() and has not changed since the previous poll, so
+    a file that is still being written is not picked up.
+    """
+
+    def __init__(self, current, expected, on_change, interval):
+        self.current = current
+        self.expected = expected
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='losight-watch', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def running(self):
+        """False after a fork, which does not carry the thread over"""
+        return self._thread.is_alive()
+
+    def _run(self):
+        previous = None
+        while not self._stop.wait(self.interval):
+            try:
+                seen = self.current()
+                if seen is not None and seen != self.expected() and seen == previous:
+                    self.on_change()
+                previous = seen
+            except Exception as e:
+                print(f"✗ Source watch failed: {e}")
@@ -0,0 +1,302 @@
+"""
+Project LOSight: Resumable, parallel dataset download
+
+download_file() fetches a (possibly compressed) file over HTTP(S):
+
+- when the server supports byte ranges, the file is split into segments that
+  are fetched in parallel and written in place into a preallocated
+  `<dest>.part` file; finished segments are recorded in `<dest>.part.json`,
+  so an interrupted download resumes where it stopped
+- otherwise the file is streamed in large blocks; when the server supports
+  ranges and has a validator (ETag / Last-Modified), the URL, size and
+  validator are recorded in `<dest>.part.json` and an interrupted stream
+  resumes from the end of the part file. A part file without a matching
+  record (left by a ranged download, or the file has changed) is discarded
+- the downloaded bytes are checked against an optional SHA-256
+- gzip and zstd sources (detected from their magic bytes) are decompressed in
+  a streaming pass; the result is renamed onto `dest` only when complete, so
+  `dest` never holds a partial file
+"""
+
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BUFFER_SIZE = 1024 * 1024
+SEGMENT_SIZE = 16 * 1024 * 1024
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_TIMEOUT = 60
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class DownloadError(Exception):
+    """Download failed or produced a file that does not match its checksum"""
+
+
+class _Progress:
+    """Thread-safe byte counter that logs every `step` percent"""
+
+    def __init__(self, total, done=0, step=10, log=print):
+        self.total = total
+        self.done = done
+        self.step = step
+        self.log = log
+        self.started = time.monotonic()
+        self._next = self._threshold(done)
+        self._lock = threading.Lock()
+
+    def _threshold(self, done):
+        if not self.total:
+            return float('inf')
+        percent = done * 100 / self.total
+        return (int(percent // self.step) + 1) * self.step
+
+    def add(self, n):
+        with self._lock:
+            self.done += n
+            if self.total and self.done * 100 / self.total >= self._next:
+                elapsed = max(time.monotonic() - self.started, 1e-6)
+                self.log(f"  Downloaded: {self.done / 1e6:.1f} MB / {self.total / 1e6:.1f} MB "
+                         f"({self.done * 100 / self.total:.0f}%, {self.done / elapsed / 1e6:.1f} MB/s)")
+                self._next = self._threshold(self.done)
+
+
+def _open(url, timeout, byte_range=None, method='GET', if_range=None):
+    headers = {'User-Agent': 'losight-downloader'}
+    if byte_range is not None:
+        headers['Range'] = f'bytes={byte_range[0]}-{byte_range[1]}'
+        if if_range:
+            # The server sends the whole file instead if it has changed since
+            headers['If-Range'] = if_range
+    request = urllib.request.Request(url, headers=headers, method=method)
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def probe(url, timeout=DEFAULT_TIMEOUT):
+    """
+    Size, range support and validator (ETag / Last-Modified) of a URL.
+    Asks for the first byte so servers that don't answer HEAD still work.
+    """
+    with _open(url, timeout, byte_range=(0, 0)) as response:
+        ranges = response.status == 206
+        size = None
+        content_range = response.headers.get('Content-Range', '')
+        if ranges and '/' in content_range:
+            total = content_range.rsplit('/', 1)[1]
+            size = int(total) if total.isdigit() else None
+        elif response.headers.get('Content-Length'):
+            size = int(response.headers['Content-Length'])
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+    return {'size': size, 'ranges': ranges and size is not None, 'validator': validator}
+
+
+def _retry(func, retries, what):
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except (urllib.error.URLError, OSError, http.client.HTTPException, DownloadError) as e:
+            if attempt == retries:
+                raise DownloadError(f"{what} failed after {retries + 1} attempts: {e}") from e
+            time.sleep(min(2 ** attempt, 30))
+
+
+def _saved_identity(path):
+    """Identity recorded in a part file's sidecar, or None"""
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+        return saved.get('identity') if isinstance(saved, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+class _SegmentState:
+    """Completed segments of a ranged download, persisted next to the part file"""
+
+    def __init__(self, path, url, info, segment_size):
+        self.path = path
+        self.identity = {
+            'url': url,
+            'size': info['size'],
+            'validator': info['validator'],
+            'segment_size': segment_size,
+        }
+        self.done = set()
+        self._lock = threading.Lock()
+        if _saved_identity(path) == self.identity:
+            with open(path) as f:
+                self.done = set(json.load(f).get('done', []))
+
+    def mark(self, segment):
+        with self._lock:
+            self.done.add(segment)
+            _save_state(self.path, {'identity': self.identity, 'done': sorted(self.done)})
+
+
+def _download_ranged(url, part_path, info, workers, segment_size, timeout, retries, log):
+    size = info['size']
+    state = _SegmentState(part_path + '.json', url, info, segment_size)
+    if not state.done or not os.path.exists(part_path) or os.path.getsize(part_path) != size:
+        state.done = set()
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+
+    segments = [(i, start, min(start + segment_size, size) - 1)
+                for i, start in enumerate(range(0, size, segment_size))]
+    pending = [s for s in segments if s[0] not in state.done]
+    resumed = sum(end - start + 1 for i, start, end in segments if i in state.done)
+    if resumed:
+        log(f"  Resuming download: {resumed / 1e6:.1f} MB already present")
+    progress = _Progress(size, done=resumed, log=log)
+
+    def fetch(segment):
+        index, start, end = segment
+
+        def attempt():
+            written = 0
+            with _open(url, timeout, byte_range=(start, end), if_range=info['validator']) as response, \
+                    open(part_path, 'r+b') as out:
+                if response.status != 206:
+                    raise DownloadError(f"server ignored range request (HTTP {response.status})")
+                out.seek(start)
+                while True:
+                    block = response.read(BUFFER_SIZE)
+                    if not block:
+                        break
+                    out.write(block)
+                    written += len(block)
+                    progress.add(len(block))
+            if written != end - start + 1:
+                progress.add(-written)
+                raise DownloadError(f"segment {index} truncated ({written} of {end - start + 1} bytes)")
+
+        _retry(attempt, retries, f"segment {index}")
+        state.mark(index)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for _ in pool.map(fetch, pending):
+            pass
+    os.remove(state.path)
+
+
+def _download_stream(url, part_path, info, timeout, retries, log):
+    """Single-stream download, appending to a part file left by an earlier stream of the same file"""
+    state_path = part_path + '.json'
+    identity = {'url': url, 'size': info['size'], 'validator': info['validator'], 'mode': 'stream'}
+    resumable = info['ranges'] and info['validator'] is not None
+    if os.path.exists(part_path) and (not resumable or _saved_identity(state_path) != identity):
+        # Bytes of another version, or a ranged download's preallocated file
+        os.remove(part_path)
+    if resumable:
+        _save_state(state_path, {'identity': identity})
+    elif os.path.exists(state_path):
+        os.remove(state_path)
+
+    def attempt():
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset and offset == info['size']:
+            return
+        byte_range = (offset, '') if resumable and 0 < offset < info['size'] else None
+        if not byte_range:
+            offset = 0
+        progress = _Progress(info['size'] or 0, done=offset, log=log)
+        with _open(url, timeout, byte_range=byte_range, if_range=info['validator']) as response:
+            mode = 'ab' if byte_range and response.status == 206 else 'wb'
+            with open(part_path, mode) as out:
+                while True:
+                    block = response.read(BUFFER_SIZE)
+                    if not block:
+                        break
+                    out.write(block)
+                    progress.add(len(block))
+        if info['size'] is not None and os.path.getsize(part_path) != info['size']:
+            raise DownloadError("connection closed before the end of the file")
+
+    _retry(attempt, retries, "download")
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+
+def _decompressor(path):
+    """File object yielding the decompressed content of path, or None"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    if magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise DownloadError("zstd-compressed download requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return None
+
+
+def download_file(url, dest, sha256=None, workers=DEFAULT_WORKERS, segment_size=SEGMENT_SIZE,
+                  timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, log=print):
+    """
+    Download url to dest (see module docstring). sha256, if given, is the
+    expected digest of the bytes served by url (before decompression).
+    Raises DownloadError on failure; partial data is kept for the next attempt
+    unless it fails the checksum.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    part_path = dest + '.part'
+    info = _retry(lambda: probe(url, timeout), retries, "probe")
+    size_note = f"{info['size'] / 1e6:.1f} MB" if info['size'] is not None else "unknown size"
+    mode = f"{workers} parallel range requests" if info['ranges'] and workers > 1 else "single stream"
+    log(f"  Source: {size_note}, {mode}")
+
+    started = time.monotonic()
+    if info['ranges'] and workers > 1:
+        _download_ranged(url, part_path, info, workers, segment_size, timeout, retries, log)
+    else:
+        _download_stream(url, part_path, info, timeout, retries, log)
+    elapsed = max(time.monotonic() - started, 1e-6)
+    size = os.path.getsize(part_path)
+    log(f"  Transferred {size / 1e6:.1f} MB in {elapsed:.1f}s ({size / elapsed / 1e6:.1f} MB/s)")
+
+    if sha256:
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(BUFFER_SIZE), b''):
+                digest.update(block)
+        if digest.hexdigest().lower() != sha256.lower():
+            os.remove(part_path)
+            raise DownloadError(f"checksum mismatch: expected {sha256}, got {digest.hexdigest()}")
+        log("  ✓ Checksum verified")
+
+    stream = _decompressor(part_path)
+    if stream is None:
+        os.replace(part_path, dest)
+        return dest
+    tmp_path = dest + '.tmp'
+    try:
+        with stream, open(tmp_path, 'wb') as out:
+            shutil.copyfileobj(stream, out, BUFFER_SIZE)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.remove(part_path)
+    log(f"  ✓ Decompressed to {os.path.getsize(dest) / 1e6:.1f} MB")
+    return dest
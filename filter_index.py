@@ -0,0 +1,224 @@
+"""
+Project LOSight: Inverted filter index
+
+Built once at load time so that a dashboard filter combination resolves to an
+array of row ids without copying or masking the full frame:
+
+- every filterable column keeps its rows grouped by value (a sorted row-id
+  list per value, stored as one argsort plus offsets)
+- Length of Stay keeps a sorted copy of its values for range queries
+
+Row ids are positions (iloc) into the frame the index was built from.
+Appended rows are merged into a new index (see FilterIndex.appended()) without
+re-sorting the existing ones.
+
+The dataset itself is stored sorted by DRG (see sort_by_drg()), so the rows of
+one DRG form a contiguous range: a DRG filter resolves to a slice, and the
+index offsets double as precomputed row counts per DRG. Appended rows are
+sorted by DRG on their own, which gives each DRG one range per appended
+segment.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Filter parameter -> dataset column
+FILTER_COLUMNS = {
+    'severity': 'APR Severity of Illness Code',
+    'payment': 'Payment_Type',
+    'admission': 'Type of Admission',
+    'drg': 'APR DRG Code',
+}
+LOS_COLUMN = 'Length of Stay'
+
+ROW_ID_DTYPE = np.int32
+
+
+def _encode(series):
+    """Integer codes (-1 for missing) and the sorted distinct values"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series, sort=True)
+
+
+def sort_by_drg(df):
+    """df with its rows stably sorted by DRG code (missing codes last)"""
+    column = FILTER_COLUMNS['drg']
+    if column not in df.columns or len(df) < 2:
+        return df
+    codes, _ = _encode(df[column])
+    # Missing values (code -1) go after every DRG
+    codes = np.where(codes < 0, np.iinfo(np.int64).max, codes)
+    if (np.diff(codes) >= 0).all():
+        return df
+    return df.take(np.argsort(codes, kind='stable')).reset_index(drop=True)
+
+
+def as_slice(rows):
+    """Ascending row ids as a slice when they are one contiguous range, else None"""
+    if rows is None or not len(rows) or rows[-1] - rows[0] + 1 != len(rows):
+        return None
+    return slice(int(rows[0]), int(rows[-1]) + 1)
+
+
+def _values(value):
+    """Filter values of a canonical filter value (a tuple selects any of several)"""
+    return value if isinstance(value, tuple) else (value,)
+
+
+class _ValueIndex:
+    """Row-id lists per distinct value of one column"""
+
+    def __init__(self, codes, uniques, order=None):
+        self.codes = codes
+        self.uniques = pd.Index(uniques)
+        self.lookup = {value: code for code, value in enumerate(self.uniques.tolist())}
+        # Rows grouped by code; missing values (code -1) sort first and are skipped
+        if order is None:
+            order = np.argsort(codes, kind='stable').astype(ROW_ID_DTYPE)
+        self.order = order
+        counts = np.bincount(codes + 1, minlength=len(self.uniques) + 1)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    @classmethod
+    def build(cls, series):
+        return cls(*_encode(series))
+
+    def appended(self, series):
+        """Index over the indexed rows followed by the rows of series"""
+        codes, uniques = _encode(series)
+        merged = self.uniques.union(pd.Index(uniques))
+        # Old and new codes in the merged value order; -1 stays missing
+        old_map = np.append(merged.get_indexer(self.uniques), -1)
+        new_map = np.append(merged.get_indexer(uniques), -1)
+        combined = np.concatenate([old_map[self.codes], new_map[codes]])
+        if (np.diff(old_map[:-1]) <= 0).any():
+            # The old values changed order: group every row again
+            return _ValueIndex(combined, merged)
+        # Each value's new rows go right after its old ones
+        old_counts = np.zeros(len(merged) + 1, dtype=np.int64)
+        old_counts[old_map[:-1] + 1] = np.diff(self.offsets)[1:]
+        old_counts[0] = self.offsets[1]
+        new_bins = new_map[codes] + 1
+        delta_order = np.argsort(new_bins, kind='stable')
+        positions = np.cumsum(old_counts)[new_bins[delta_order]]
+        order = np.insert(self.order, positions, (len(self.codes) + delta_order).astype(ROW_ID_DTYPE))
+        return _ValueIndex(combined, merged, order)
+
+    def code_of(self, value):
+        return self.lookup.get(value, -1)
+
+    def rows(self, code):
+        """Ascending row ids holding the value with this code"""
+        if code < 0:
+            return np.empty(0, dtype=ROW_ID_DTYPE)
+        return self.order[self.offsets[code + 1]:self.offsets[code + 2]]
+
+    def count(self, code):
+        if code < 0:
+            return 0
+        return int(self.offsets[code + 2] - self.offsets[code + 1])
+
+    def rows_of(self, codes):
+        """Ascending row ids holding any of the values with these codes"""
+        if len(codes) <= 1:
+            return self.rows(codes[0] if codes else -1)
+        return np.sort(np.concatenate([self.rows(code) for code in codes]))
+
+    def matches(self, rows, codes):
+        """Mask of the given rows holding any of the values with these codes"""
+        if len(codes) == 1:
+            return self.codes[rows] == codes[0]
+        return np.isin(self.codes[rows], codes)
+
+    def value_counts(self):
+        """Rows per distinct value, in value order"""
+        return pd.Series(np.diff(self.offsets)[1:], index=self.uniques)
+
+
+class FilterIndex:
+    """Resolve canonical filter dicts to row ids of the indexed frame"""
+
+    def __init__(self, n_rows, columns, los=None, los_order=None, los_sorted=None):
+        self.n_rows = n_rows
+        self.columns = columns          # filter name -> _ValueIndex
+        self.los = los
+        self.los_order = los_order
+        self.los_sorted = los_sorted
+
+    @classmethod
+    def build(cls, df):
+        columns = {
+            name: _ValueIndex.build(df[col])
+            for name, col in FILTER_COLUMNS.items()
+            if col in df.columns
+        }
+        if LOS_COLUMN not in df.columns:
+            return cls(len(df), columns)
+        los = df[LOS_COLUMN].to_numpy()
+        los_order = np.argsort(los, kind='stable').astype(ROW_ID_DTYPE)
+        return cls(len(df), columns, los, los_order, los[los_order])
+
+    def appended(self, delta):
+        """
+        Index over the indexed rows followed by the rows of delta, which has
+        the same columns. Existing row ids keep their place; only delta's rows
+        are sorted and merged in.
+        """
+        columns = {name: index.appended(delta[FILTER_COLUMNS[name]]) for name, index in self.columns.items()}
+        if self.los is None:
+            return FilterIndex(self.n_rows + len(delta), columns)
+        new_los = delta[LOS_COLUMN].to_numpy()
+        dtype = np.result_type(self.los.dtype, new_los.dtype)
+        delta_order = np.argsort(new_los, kind='stable')
+        # Equal values keep row-id order: delta rows go after the existing ones
+        positions = np.searchsorted(self.los_sorted, new_los[delta_order], side='right')
+        return FilterIndex(
+            self.n_rows + len(delta),
+            columns,
+            np.concatenate([self.los.astype(dtype, copy=False), new_los.astype(dtype, copy=False)]),
+            np.insert(self.los_order, positions, (self.n_rows + delta_order).astype(ROW_ID_DTYPE)),
+            np.insert(self.los_sorted.astype(dtype, copy=False), positions, new_los[delta_order].astype(dtype)),
+        )
+
+    def value_counts(self, name):
+        """Rows per value of filter `name` (None if it is not indexed)"""
+        index = self.columns.get(name)
+        return index.value_counts() if index is not None else None
+
+    def select(self, filters):
+        """
+        Row ids (ascending) matching every filter, or None for all rows.
+        filters maps filter names to canonical values; None means unfiltered
+        and a tuple matches any of its values.
+        """
+        equality = [
+            # Unknown values (code -1) match nothing
+            (self.columns[name], [c for c in map(self.columns[name].code_of, _values(value)) if c >= 0])
+            for name, value in filters.items()
+            if value is not None and name in self.columns
+        ]
+        los_range = None
+        if self.los is not None and filters.get('los_min') is not None and filters.get('los_max') is not None:
+            los_range = (filters['los_min'], filters['los_max'])
+
+        if not equality and los_range is None:
+            return None
+
+        if equality:
+            # Start from the most selective value and check the rest in place
+            equality.sort(key=lambda item: sum(item[0].count(code) for code in item[1]))
+            index, codes = equality[0]
+            rows = index.rows_of(codes)
+            for index, codes in equality[1:]:
+                if not len(rows):
+                    break
+                rows = rows[index.matches(rows, codes)]
+            if los_range is not None and len(rows):
+                los = self.los[rows]
+                rows = rows[(los >= los_range[0]) & (los <= los_range[1])]
+            return rows
+
+        lo = np.searchsorted(self.los_sorted, los_range[0], side='left')
+        hi = np.searchsorted(self.los_sorted, los_range[1], side='right')
+        return np.sort(self.los_order[lo:hi])
@@ -0,0 +1,55 @@
+"""
+Gunicorn configuration for multi-worker serving
+
+    gunicorn -c gunicorn.conf.py server:app
+
+The dataset is loaded once in the master process before the workers are
+forked, so all workers share it instead of each holding a private copy:
+
+- columns loaded from the dataset cache are memory-mapped .npy files, which
+  every process maps from the same page cache
+- the filter index and aggregation cube are built in the master and inherited
+  copy-on-write; they are never written after startup
+- gc.freeze() moves everything allocated at startup out of the garbage
+  collector's reach, so collections in the workers don't dirty those pages
+
+With LOSIGHT_PRELOAD=0 each worker loads the dataset itself; it still maps the
+cached columns zero-copy but builds its own index and cube.
+
+A dataset reloaded or appended at runtime (see dataset_state.py) lives in the
+worker that built it. Set LOSIGHT_WATCH_INTERVAL so that the other workers
+pick up the rewritten dataset cache.
+
+The result cache warm-up (see warmup.py) also runs in the master, before
+the fork, so every worker starts with the common filter combinations
+already computed; it is bounded by LOSIGHT_WARMUP_SECONDS.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = 0
+preload_app = os.environ.get('LOSIGHT_PRELOAD', '1') != '0'
+
+
+def when_ready(server):
+    """Load the dataset and warm the result cache in the master once the (preloaded) app is imported"""
+    if not preload_app:
+        return
+    import server as losight
+    losight.load_data()
+    losight.warmup_scheduler.wait()
+    gc.collect()
+    gc.freeze()
+    server.log.info("Dataset loaded in master; forking %d workers", workers)
+
+
+def post_worker_init(worker):
+    """Workers without a preloaded dataset load (and map) it on start"""
+    if not preload_app:
+        import server as losight
+        losight.load_data()
@@ -0,0 +1,152 @@
+"""
+Project LOSight: Streaming chunked CSV ingestion
+
+read_csv_chunked() parses the CSV in fixed-size chunks, runs a per-chunk
+`prepare` function (cleaning and row-level features) and appends the result
+into preallocated column buffers. Peak memory stays close to the final frame
+plus one chunk instead of several copies of the whole file.
+
+Categorical columns are kept dictionary-encoded while streaming: each chunk's
+codes are remapped onto one growing dictionary per column, and the column is
+returned as a categorical. Other text columns (which may hold free text of
+any cardinality) are collected as objects and keep the dtype read_csv gave
+them.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 200_000
+# Over-allocation tolerated before a buffer is trimmed with a copy
+TRIM_SLACK = 1.1
+
+
+def estimate_rows(path, sample_bytes=1024 * 1024):
+    """Approximate data row count from the average line length of the file head"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    lines = sample.count(b'\n')
+    if lines < 2:
+        return 1024
+    return int(size / (len(sample) / lines)) + 1
+
+
+class _NumericBuffer:
+    def __init__(self, dtype, capacity):
+        self.values = np.empty(capacity, dtype=dtype)
+
+    def append(self, series, start, capacity):
+        values = series.to_numpy()
+        dtype = np.result_type(self.values.dtype, values.dtype)
+        if dtype != self.values.dtype:
+            # A later chunk needs a wider type (e.g. NaN in an int column)
+            self.values = self.values.astype(dtype)
+        if len(self.values) < capacity:
+            grown = np.empty(capacity, dtype=self.values.dtype)
+            grown[:start] = self.values[:start]
+            self.values = grown
+        self.values[start:start + len(values)] = values
+
+    def finish(self, n):
+        if len(self.values) > n * TRIM_SLACK:
+            return self.values[:n].copy()
+        return self.values[:n]
+
+
+class _CategoryBuffer:
+    def __init__(self, capacity):
+        self.codes = np.empty(capacity, dtype=np.int32)
+        self.lookup = {}
+
+    def append(self, series, start, capacity):
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('category')
+        # Map this chunk's categories onto the global dictionary
+        remap = np.array(
+            [self.lookup.setdefault(v, len(self.lookup)) for v in series.cat.categories.tolist()] + [-1],
+            dtype=np.int32,
+        )
+        codes = remap[series.cat.codes.to_numpy()]
+        if len(self.codes) < capacity:
+            grown = np.empty(capacity, dtype=np.int32)
+            grown[:start] = self.codes[:start]
+            self.codes = grown
+        self.codes[start:start + len(codes)] = codes
+
+    def finish(self, n):
+        categories = list(self.lookup)
+        codes = self.codes[:n]
+        # Same category order as Series.astype('category')
+        order = np.argsort(np.array(categories, dtype=object)) if categories else np.empty(0, dtype=np.intp)
+        recode = np.empty(len(categories) + 1, dtype=np.int32)
+        recode[order] = np.arange(len(categories), dtype=np.int32)
+        recode[-1] = -1
+        codes = pd.to_numeric(recode[codes], downcast='integer')
+        return pd.Categorical.from_codes(codes, categories=[categories[i] for i in order])
+
+
+class _ObjectBuffer:
+    def __init__(self, dtype, capacity):
+        self.dtype = dtype
+        self.values = np.empty(capacity, dtype=object)
+
+    def append(self, series, start, capacity):
+        if len(self.values) < capacity:
+            grown = np.empty(capacity, dtype=object)
+            grown[:start] = self.values[:start]
+            self.values = grown
+        self.values[start:start + len(series)] = series.to_numpy(dtype=object)
+
+    def finish(self, n):
+        return pd.array(self.values[:n], dtype=self.dtype)
+
+
+def _buffer(series, capacity):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return _CategoryBuffer(capacity)
+    if series.dtype.kind in 'biuf':
+        return _NumericBuffer(series.dtype, capacity)
+    return _ObjectBuffer(series.dtype, capacity)
+
+
+def read_csv_chunked(path, prepare, usecols=None, dtype=None, chunksize=DEFAULT_CHUNKSIZE, log=print):
+    """
+    Stream path through prepare(chunk) -> DataFrame and return the
+    concatenated result. usecols and dtype are passed to pandas.read_csv.
+    """
+    capacity = estimate_rows(path)
+    total_bytes = os.path.getsize(path)
+    buffers = {}
+    columns = None
+    n = 0
+    started = time.monotonic()
+    rows_read = 0
+
+    with open(path, 'rb') as f:
+        reader = pd.read_csv(f, usecols=usecols, dtype=dtype, chunksize=chunksize, low_memory=False)
+        for chunk in reader:
+            rows_read += len(chunk)
+            chunk = prepare(chunk)
+            if columns is None:
+                columns = list(chunk.columns)
+            if n + len(chunk) > capacity:
+                capacity = max(int(capacity * 1.25), n + len(chunk))
+            for col in columns:
+                series = chunk[col]
+                if col not in buffers:
+                    buffers[col] = _buffer(series, capacity)
+                buffers[col].append(series, n, capacity)
+            n += len(chunk)
+
+            elapsed = max(time.monotonic() - started, 1e-6)
+            percent = min(f.tell() * 100 / total_bytes, 100) if total_bytes else 100
+            log(f"  Ingested {rows_read:,} rows ({percent:.0f}%, {rows_read / elapsed:,.0f} rows/s)")
+
+    if columns is None:
+        return pd.read_csv(path, usecols=usecols, dtype=dtype, nrows=0)
+    data = {col: buffers.pop(col).finish(n) for col in columns}
+    return pd.DataFrame(data, copy=False)
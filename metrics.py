@@ -0,0 +1,227 @@
+"""
+Project LOSight: Request instrumentation
+
+In-process metrics exposed at /api/metrics in the Prometheus text format:
+
+- per-endpoint histograms of request time, of the time spent in each phase
+  (filter, aggregate, serialize), of rows scanned and of response size
+- gauges for startup phases and anything the server reports at scrape time
+
+RequestTimer collects the phases of one request; nested phases pause their
+parent, so each phase reports exclusive time. SamplingProfiler is an opt-in
+stack sampler for individual requests.
+
+Metrics are per process: under Gunicorn every worker keeps its own.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (0, 1e3, 1e4, 1e5, 1e6, 1e7)
+BYTES_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label value tuple"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                for bound, n in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels, label_values, [('le', _format_value(bound))])
+                    lines.append(f'{self.name}_bucket{labels} {n}')
+                labels = _format_labels(self.labels, label_values, [('le', '+Inf')])
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Gauge:
+    """
+    Last-set value per label value tuple. With type='counter' it exposes a
+    monotonic count maintained elsewhere (e.g. cache hits) and set at scrape time.
+    """
+
+    def __init__(self, name, help, labels=(), type='gauge'):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.type = type
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        with self._lock:
+            return [f'{self.name}{_format_labels(self.labels, k)} {_format_value(v)}'
+                    for k, v in sorted(self._values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'losight_request_duration_seconds', 'Request handling time', ['endpoint']))
+PHASE_SECONDS = REGISTRY.register(Histogram(
+    'losight_request_phase_seconds', 'Exclusive time per request phase', ['endpoint', 'phase']))
+ROWS_SCANNED = REGISTRY.register(Histogram(
+    'losight_rows_scanned', 'Dataset rows materialized per request', ['endpoint'], ROWS_BUCKETS))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    'losight_response_bytes', 'Response body size', ['endpoint'], BYTES_BUCKETS))
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    'losight_startup_phase_seconds', 'Time spent in each phase of the last dataset load', ['phase']))
+DATASET_ROWS = REGISTRY.register(Gauge(
+    'losight_dataset_rows', 'Rows in the loaded dataset'))
+RESULT_CACHE_BYTES = REGISTRY.register(Gauge(
+    'losight_result_cache_bytes', 'Size of the cached results'))
+RESULT_CACHE_ENTRIES = REGISTRY.register(Gauge(
+    'losight_result_cache_entries', 'Number of cached results'))
+RESULT_CACHE_LOOKUPS = REGISTRY.register(Gauge(
+    'losight_result_cache_lookups_total', 'Result cache lookups', ['result'], type='counter'))
+
+
+class RequestTimer:
+    """Exclusive time per phase and rows scanned for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.rows_scanned = 0
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name):
+        entry = [time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[0]
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - entry[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def observe(self, endpoint, response_bytes):
+        """Record this request in the endpoint histograms"""
+        total = self.elapsed()
+        REQUEST_SECONDS.observe((endpoint,), total)
+        for name, seconds in self.phases.items():
+            PHASE_SECONDS.observe((endpoint, name), seconds)
+        ROWS_SCANNED.observe((endpoint,), self.rows_scanned)
+        RESPONSE_BYTES.observe((endpoint,), response_bytes)
+        return total
+
+    def server_timing(self, total):
+        """Server-Timing header value (durations in milliseconds)"""
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.phases.items()]
+        parts.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread every `interval` seconds from a
+    background thread. collapsed() returns the samples in the collapsed-stack
+    format read by flamegraph tools ("outer;inner;leaf count" per line).
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='losight-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {n}\n' for stack, n in self.samples.most_common())
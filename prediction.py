@@ -0,0 +1,235 @@
+"""
+Project LOSight: Length of Stay prediction model
+
+LOSModel is a ridge regression of log(1 + LOS) on admission-time features of
+the prepared dataset (see create_features() in server.py). Fitting walks the
+rows in chunks, accumulating the feature moments and then the normal
+equations, so the full design matrix is never materialized.
+
+Prediction intervals come from empirical quantiles of the training residuals
+in log space. DRG frequency and median LOS are stored as sorted lookup arrays,
+so scoring a batch is a searchsorted plus one matrix-vector product.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Bump when the features or the fitting procedure change
+MODEL_VERSION = 1
+
+LOS_COLUMN = 'Length of Stay'
+DRG_COLUMN = 'APR DRG Code'
+
+# Features known at admission (discharge disposition is deliberately absent)
+FEATURES = [
+    'APR Severity of Illness Code',
+    'APR_Risk_Mortality_Ordinal',
+    'Age_Numeric',
+    'Is_Senior',
+    'Is_Medicaid',
+    'Is_Medicare',
+    'Is_Private_Insurance',
+    'Is_Emergency',
+    'Is_Elective',
+    'Severity_x_Senior',
+    'Severity_x_Risk',
+    'Severity_x_Medicaid',
+    'DRG_Median_LOS',
+    'DRG_freq',
+]
+
+# Skewed features used as log(1 + x)
+LOG_FEATURES = ('DRG_Median_LOS', 'DRG_freq')
+
+RIDGE_ALPHA = 1.0
+INTERVAL_QUANTILES = (0.1, 0.9)
+FIT_CHUNK_ROWS = 250_000
+
+
+def fingerprint(df):
+    """Cheap identity of the training data, stored with the model"""
+    los = df[LOS_COLUMN].to_numpy()
+    parts = [MODEL_VERSION, len(df), int(los.sum(dtype=np.int64))]
+    if DRG_COLUMN in df.columns:
+        parts.append(float(np.nansum(df[DRG_COLUMN].to_numpy(dtype=np.float64))))
+    return ':'.join(str(p) for p in parts)
+
+
+def _raw_features(frame, features, n):
+    """n × len(features) float64 matrix; missing columns are all-NaN"""
+    X = np.full((n, len(features)), np.nan)
+    for j, name in enumerate(features):
+        if name in frame:
+            X[:, j] = np.asarray(pd.to_numeric(frame[name], errors='coerce'), dtype=np.float64)
+        if name in LOG_FEATURES:
+            X[:, j] = np.log1p(X[:, j])
+    return X
+
+
+class LOSModel:
+    """Ridge regression on log1p(LOS) with DRG lookup tables"""
+
+    def __init__(self, features, coef, intercept, center, scale, drg_codes, drg_median, drg_freq,
+                 residual_quantiles, rows, fingerprint):
+        self.features = list(features)
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.center = center                    # per feature; also the fill value for NaN
+        self.scale = scale
+        self.drg_codes = drg_codes              # sorted DRG codes
+        self.drg_median = drg_median            # DRG_Median_LOS per code
+        self.drg_freq = drg_freq                # DRG_freq per code
+        self.residual_quantiles = residual_quantiles
+        self.rows = int(rows)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def fit(cls, df, alpha=RIDGE_ALPHA, chunk_rows=FIT_CHUNK_ROWS):
+        features = [f for f in FEATURES if f in df.columns]
+        if not features:
+            raise ValueError('no model features in the dataset')
+
+        # DRG lookup tables from the already computed per-row DRG features
+        drg_codes = drg_median = drg_freq = np.empty(0)
+        if DRG_COLUMN in df.columns:
+            drg = df[DRG_COLUMN].to_numpy(dtype=np.float64)
+            drg_codes, first = np.unique(drg, return_index=True)
+            keep = ~np.isnan(drg_codes)
+            drg_codes, first = drg_codes[keep], first[keep]
+            for name in ('DRG_Median_LOS', 'DRG_freq'):
+                values = df[name].to_numpy(dtype=np.float64)[first] if name in df.columns else np.full(len(first), np.nan)
+                if name == 'DRG_Median_LOS':
+                    drg_median = values
+                else:
+                    drg_freq = values
+
+        n = len(df)
+        chunks = [(start, min(start + chunk_rows, n)) for start in range(0, n, chunk_rows)]
+
+        def design_chunk(start, stop, center, scale):
+            X = (_raw_features(df.iloc[start:stop], features, stop - start) - center) / scale
+            X[np.isnan(X)] = 0.0
+            return np.hstack([np.ones((stop - start, 1)), X])
+
+        def target_chunk(start, stop):
+            return np.log1p(df[LOS_COLUMN].to_numpy(dtype=np.float64)[start:stop])
+
+        # Pass 1: per-feature mean and standard deviation (NaN ignored)
+        k = len(features)
+        count, total, squares = np.zeros(k), np.zeros(k), np.zeros(k)
+        for start, stop in chunks:
+            X = _raw_features(df.iloc[start:stop], features, stop - start)
+            valid = ~np.isnan(X)
+            count += valid.sum(axis=0)
+            total += np.where(valid, X, 0).sum(axis=0)
+            squares += np.where(valid, X * X, 0).sum(axis=0)
+        center = np.divide(total, count, out=np.zeros(k), where=count > 0)
+        variance = np.divide(squares, count, out=np.zeros(k), where=count > 0) - center ** 2
+        scale = np.sqrt(np.maximum(variance, 0))
+        scale[scale == 0] = 1.0
+
+        # Pass 2: normal equations X'X b = X'y (intercept not penalized)
+        xtx = np.zeros((k + 1, k + 1))
+        xty = np.zeros(k + 1)
+        for start, stop in chunks:
+            X = design_chunk(start, stop, center, scale)
+            xtx += X.T @ X
+            xty += X.T @ target_chunk(start, stop)
+        penalty = alpha * np.eye(k + 1)
+        penalty[0, 0] = 0.0
+        beta = np.linalg.solve(xtx + penalty, xty)
+
+        # Pass 3: residual quantiles for the prediction interval
+        residuals = np.concatenate([
+            (target_chunk(start, stop) - design_chunk(start, stop, center, scale) @ beta).astype(np.float32)
+            for start, stop in chunks
+        ])
+        residual_quantiles = np.quantile(residuals, INTERVAL_QUANTILES)
+
+        return cls(features, beta[1:], beta[0], center, scale, drg_codes, drg_median, drg_freq,
+                   residual_quantiles, n, fingerprint(df))
+
+    def _design(self, frame, n):
+        frame = dict(frame)
+        if DRG_COLUMN in frame and len(self.drg_codes):
+            # DRG features from the lookup tables; unknown codes stay NaN
+            drg = np.asarray(pd.to_numeric(frame[DRG_COLUMN], errors='coerce'), dtype=np.float64)
+            pos = np.clip(np.searchsorted(self.drg_codes, drg), 0, len(self.drg_codes) - 1)
+            known = self.drg_codes[pos] == drg
+            frame['DRG_Median_LOS'] = np.where(known, self.drg_median[pos], np.nan)
+            frame['DRG_freq'] = np.where(known, self.drg_freq[pos], np.nan)
+        X = (_raw_features(frame, self.features, n) - self.center) / self.scale
+        X[np.isnan(X)] = 0.0
+        return X
+
+    def predict(self, frame):
+        """
+        Predicted LOS (days) and interval bounds for each row of frame, a
+        DataFrame with (a subset of) the feature columns. Missing or unknown
+        values are imputed with the training mean.
+        """
+        n = len(frame)
+        mu = self._design(frame, n) @ self.coef + self.intercept
+        low, high = self.residual_quantiles
+        return {
+            'predicted_los': np.expm1(mu),
+            'low': np.expm1(mu + low),
+            'high': np.expm1(mu + high),
+        }
+
+    def describe(self):
+        return {
+            'version': MODEL_VERSION,
+            'target': 'log1p(Length of Stay)',
+            'rows': self.rows,
+            'intercept': self.intercept,
+            'coefficients': dict(zip(self.features, (self.coef / self.scale).tolist())),
+            'interval_quantiles': list(INTERVAL_QUANTILES),
+            'residual_quantiles': self.residual_quantiles.tolist(),
+            'drg_codes': len(self.drg_codes),
+        }
+
+    def save(self, path):
+        """Write the model as an .npz file (atomically replaced)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp-{os.getpid()}.npz'
+        meta = {'version': MODEL_VERSION, 'features': self.features, 'intercept': self.intercept,
+                'rows': self.rows, 'fingerprint': self.fingerprint}
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), coef=self.coef, center=self.center,
+                 scale=self.scale, drg_codes=self.drg_codes, drg_median=self.drg_median,
+                 drg_freq=self.drg_freq, residual_quantiles=self.residual_quantiles)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, expected_fingerprint):
+        """The model saved at path if it was fitted on the same data, else None"""
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                meta = json.loads(str(f['meta']))
+                if meta.get('version') != MODEL_VERSION or meta.get('fingerprint') != expected_fingerprint:
+                    return None
+                return cls(meta['features'], f['coef'], meta['intercept'], f['center'], f['scale'],
+                           f['drg_codes'], f['drg_median'], f['drg_freq'], f['residual_quantiles'],
+                           meta['rows'], meta['fingerprint'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def load_or_fit(df, path=None, log=print):
+    """Model for df: loaded from path when it matches, otherwise fitted (and saved to path)"""
+    if path:
+        model = LOSModel.load(path, fingerprint(df))
+        if model is not None:
+            log(f"✓ Prediction model loaded from: {path}")
+            return model
+    model = LOSModel.fit(df)
+    log(f"✓ Prediction model fitted on {model.rows:,} rows ({len(model.features)} features)")
+    if path:
+        try:
+            model.save(path)
+        except OSError as e:
+            log(f"✗ Could not save prediction model: {e}")
+    return model
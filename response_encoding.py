@@ -0,0 +1,103 @@
+"""
+Project LOSight: Response encoding helpers
+
+- dumps(): JSON bytes, through orjson when it is installed (several times
+  faster on large payloads) and the standard library otherwise
+- binary_array(): numeric array as base64 of its little-endian bytes, which
+  the dashboard turns back into a typed array
+- negotiate() / compress(): gzip or brotli (when the 'brotli' package is
+  installed) content encoding chosen from the Accept-Encoding header
+"""
+
+import base64
+import gzip
+import json
+import math
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# dtypes that JavaScript typed arrays can represent directly
+TYPED_ARRAY_DTYPES = ('int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32', 'float32', 'float64')
+
+
+def _default(value):
+    """JSON fallback for NumPy values"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _json_safe(value):
+    """value with NaN and infinities replaced by None, as orjson writes them"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, (np.generic, np.ndarray)):
+        return _json_safe(_default(value))
+    return value
+
+
+def dumps(payload):
+    """payload as compact JSON bytes with sorted keys; non-finite numbers become null"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    # The standard library would write bare NaN, which JSON.parse rejects
+    return json.dumps(_json_safe(payload), default=_default, sort_keys=True, separators=(',', ':'),
+                      allow_nan=False).encode('utf-8')
+
+
+def binary_array(values):
+    """{'dtype', 'base64'} encoding of a numeric array"""
+    values = np.asarray(values)
+    if values.dtype.kind == 'b':
+        values = values.astype(np.uint8)
+    elif values.dtype.name not in TYPED_ARRAY_DTYPES:
+        # No 64-bit integer typed arrays without BigInt: narrow when exact
+        if values.dtype.kind in 'iu' and (not len(values) or (values.min() >= -2 ** 31 and values.max() < 2 ** 31)):
+            values = values.astype(np.int32)
+        else:
+            values = values.astype(np.float64)
+    data = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<')).tobytes()
+    return {'dtype': values.dtype.name, 'base64': base64.b64encode(data).decode('ascii')}
+
+
+def negotiate(accept_encoding):
+    """Best supported content encoding for an Accept-Encoding header, or None"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
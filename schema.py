@@ -0,0 +1,181 @@
+"""
+Project LOSight: Column schema and compact in-memory dtypes
+
+optimize_dtypes() is applied at load time. Low-cardinality strings become
+categoricals, 0/1 flags become int8, and numeric columns are downcast to the
+smallest dtype that holds every value exactly. The memory reports of the
+steps (CSV chunks, then the whole frame) are combined with sum_reports() and
+merge_reports().
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+CATEGORY = 'category'
+FLAG = 'flag'
+INTEGER = 'integer'
+FLOAT = 'float'
+
+# Known columns of hospital_data_clean_base_all_drgs.csv and create_features()
+COLUMN_SCHEMA = {
+    'Payment_Type': CATEGORY,
+    'Type of Admission': CATEGORY,
+    'Gender': CATEGORY,
+    'Age Group': CATEGORY,
+    'Patient Disposition': CATEGORY,
+    'APR Risk of Mortality': CATEGORY,
+    'APR Severity of Illness Code': INTEGER,
+    'APR DRG Code': INTEGER,
+    'Length of Stay': INTEGER,
+    'Is_Senior': FLAG,
+    'Is_Medicaid': FLAG,
+    'Is_Medicare': FLAG,
+    'Is_Private_Insurance': FLAG,
+    'Needs_Skilled_Nursing': FLAG,
+    'Needs_Rehab': FLAG,
+    'Discharge_Home': FLAG,
+    'Is_Emergency': FLAG,
+    'Is_Elective': FLAG,
+    'Age_Numeric': FLOAT,
+    'APR_Risk_Mortality_Ordinal': FLOAT,
+    'Severity_x_Senior': INTEGER,
+    'Severity_x_Risk': FLOAT,
+    'Severity_x_Medicaid': INTEGER,
+    'DRG_freq': INTEGER,
+    'DRG_Median_LOS': FLOAT,
+}
+
+# Columns outside the schema become categoricals below this distinct-value ratio
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+def csv_dtypes():
+    """
+    read_csv dtypes for the schema's text columns, which are parsed straight
+    into categoricals; numeric columns keep pandas' inference.
+    """
+    return {col: 'category' for col, kind in COLUMN_SCHEMA.items() if kind == CATEGORY}
+
+
+def _infer_kind(series):
+    """Schema kind for a column that is not listed in COLUMN_SCHEMA"""
+    if series.dtype.kind in 'iu':
+        return INTEGER
+    if series.dtype.kind == 'f':
+        return FLOAT
+    if series.dtype.kind == 'b':
+        return FLAG
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+    n_unique = series.nunique(dropna=True)
+    if len(series) and n_unique / len(series) <= CATEGORY_MAX_UNIQUE_RATIO:
+        return CATEGORY
+    return None
+
+
+def _downcast_float(series):
+    """Integer dtype if every value is a whole number, else float32 if lossless"""
+    values = series.to_numpy()
+    if not np.isnan(values).any() and np.array_equal(values, np.floor(values)):
+        return pd.to_numeric(series.astype(np.int64), downcast='integer')
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed, values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+
+def _convert(series, kind):
+    if kind == CATEGORY:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        return series.astype('category')
+    if kind == FLAG:
+        if series.isna().any():
+            return series
+        return series.astype(np.int8)
+    # INTEGER and FLOAT columns: whole numbers end up in the smallest int dtype
+    if series.dtype.kind in 'iu':
+        return pd.to_numeric(series, downcast='integer')
+    if series.dtype.kind == 'f':
+        return _downcast_float(series)
+    return series
+
+
+def _str_memory_usage(series):
+    """Deep bytes of categorical series as the str column read_csv parses without csv_dtypes()"""
+    sizes = np.array([sys.getsizeof(v) for v in series.cat.categories] + [sys.getsizeof(np.nan)], dtype=np.int64)
+    return 8 * len(series) + int(sizes[series.cat.codes.to_numpy()].sum())
+
+
+def optimize_dtypes(df, columns=None, parsed_categories=()):
+    """
+    Convert df's columns (or only those in columns) in place to compact dtypes.
+    parsed_categories are columns read_csv parsed straight into categoricals;
+    their size before conversion is reported as that of the str column.
+    Returns a per-column memory report (see memory_report()).
+    """
+    before = df.memory_usage(index=False, deep=True)
+    before_dtypes = df.dtypes.astype(str)
+    for col in parsed_categories:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            before[col] = _str_memory_usage(df[col])
+            before_dtypes[col] = 'str'
+    for col in df.columns if columns is None else [c for c in df.columns if c in columns]:
+        kind = COLUMN_SCHEMA.get(col) or _infer_kind(df[col])
+        if kind is None:
+            continue
+        df[col] = _convert(df[col], kind)
+    after = df.memory_usage(index=False, deep=True)
+    return memory_report(before, after, before_dtypes, df.dtypes.astype(str))
+
+
+def memory_report(before, after, before_dtypes, after_dtypes):
+    """Per-column and total bytes before and after dtype conversion"""
+    columns = [
+        {
+            'column': col,
+            'dtype_before': before_dtypes[col],
+            'dtype_after': after_dtypes[col],
+            'bytes_before': int(before[col]),
+            'bytes_after': int(after[col]),
+        }
+        for col in after.index
+    ]
+    return _with_totals(columns)
+
+
+def sum_reports(reports):
+    """Reports of several chunks (or frames) added up per column; None entries are skipped"""
+    columns = {}
+    for report in reports:
+        for entry in (report or {}).get('columns', []):
+            total = columns.setdefault(entry['column'], dict(entry, bytes_before=0, bytes_after=0))
+            total['bytes_before'] += entry['bytes_before']
+            total['bytes_after'] += entry['bytes_after']
+    return _with_totals(list(columns.values()))
+
+
+def merge_reports(first, second):
+    """
+    Report of two conversions in a row: sizes and dtypes before from first
+    where it has the column, after from second.
+    """
+    earlier = {entry['column']: entry for entry in first['columns']}
+    columns = []
+    for entry in second['columns']:
+        entry = dict(entry)
+        if entry['column'] in earlier:
+            entry['dtype_before'] = earlier[entry['column']]['dtype_before']
+            entry['bytes_before'] = earlier[entry['column']]['bytes_before']
+        columns.append(entry)
+    return _with_totals(columns)
+
+
+def _with_totals(columns):
+    return {
+        'columns': columns,
+        'total_bytes_before': sum(entry['bytes_before'] for entry in columns),
+        'total_bytes_after': sum(entry['bytes_after'] for entry in columns),
+    }
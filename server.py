@@ -4,14 +4,37 @@ Flask Backend Server for Interactive Dashboard
 Serves data from hospital_data_clean_base_all_drgs.csv
 """
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, g, has_request_context, jsonify, request, send_from_directory
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import os
 import json
-import urllib.request
-import shutil
+import math
+import atexit
+import contextlib
+import functools
+import hashlib
+import hmac
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from downloader import download_file
+from dataset_cache import (FEATURE_SCHEMA_VERSION, load_cached_frame, load_cached_metadata, manifest_mtime,
+                           save_cached_frame)
+from dataset_state import DatasetState, DRGStats, ReloadWorker, SourceWatcher, append_frame
+from schema import COLUMN_SCHEMA, csv_dtypes, merge_reports, optimize_dtypes, sum_reports
+from ingest import read_csv_chunked
+from filter_index import FilterIndex, as_slice, sort_by_drg
+from result_cache import ResultCache
+from aggregation_cube import CubeSet, DIMENSION_COLUMNS, dimension_series, histogram_summary
+import prediction
+import metrics
+import response_encoding
+from warmup import RequestLog, WarmupScheduler
 
 # Setup Flask app
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,54 +43,107 @@ STATIC_DIR = os.path.join(BASE_DIR, 'static')
 app = Flask(__name__, static_folder=STATIC_DIR, static_url_path='/static')
 CORS(app)
 
-# Global data cache
-df = None
+# Loaded dataset with its filter index, cube and model (see dataset_state.py).
+# Reloads and appends replace it as a whole; each request keeps the state it
+# started with (see current_state())
+dataset_state = None
+_load_lock = threading.Lock()
+
+# Serialized results of the /api/data/* endpoints (LOSIGHT_RESULT_CACHE_MB=0 disables)
+RESULT_CACHE_MB = float(os.environ.get('LOSIGHT_RESULT_CACHE_MB', '64'))
+result_cache = ResultCache(int(RESULT_CACHE_MB * 1024 * 1024))
+
+# Bump when the shape of any cached response changes, so browsers drop old ETags
+RESPONSE_VERSION = 1
+
+# Background reloads and delta appends, run one at a time
+reloader = ReloadWorker()
+
+# Seconds between checks of the CSV and dataset cache for changes (0 = no watching)
+WATCH_INTERVAL = float(os.environ.get('LOSIGHT_WATCH_INTERVAL', '0'))
+watcher = None
+
+# Bearer token for /api/admin/* (the admin endpoints are disabled without one)
+ADMIN_TOKEN = os.environ.get('LOSIGHT_ADMIN_TOKEN', '')
+
+# Sampling profiler for single requests (?profile=1), off unless LOSIGHT_PROFILING=1
+PROFILING = os.environ.get('LOSIGHT_PROFILING', '') == '1'
+
+# Explicit dataset location, searched before the default paths
+CSV_PATH = os.environ.get('LOSIGHT_CSV_PATH', '')
 
 # CSV download URL (set this as an environment variable or update here)
 # Get this URL after uploading CSV to Google Drive or Dropbox
 CSV_DOWNLOAD_URL = os.environ.get('CSV_DOWNLOAD_URL', '')
+# Optional SHA-256 of the file served at CSV_DOWNLOAD_URL
+CSV_SHA256 = os.environ.get('CSV_SHA256', '')
+DOWNLOAD_WORKERS = int(os.environ.get('LOSIGHT_DOWNLOAD_WORKERS', '4'))
+
+# Columnar cache of the prepared dataset (set LOSIGHT_CACHE_DIR to '' to disable)
+DATA_CACHE_DIR = os.environ.get('LOSIGHT_CACHE_DIR', os.path.join(BASE_DIR, '.losight_cache'))
+DATA_CACHE_MMAP = os.environ.get('LOSIGHT_CACHE_MMAP', '1') != '0'
+
+# Fitted prediction model, reused while the dataset is unchanged
+MODEL_PATH = os.environ.get('LOSIGHT_MODEL_PATH',
+                            os.path.join(DATA_CACHE_DIR, 'los_model.npz') if DATA_CACHE_DIR else '')
+
+# CSV ingestion: rows per parsed chunk, and whether columns outside the schema
+# (which no endpoint uses) are kept (LOSIGHT_CSV_COLUMNS=all)
+CSV_CHUNK_ROWS = int(os.environ.get('LOSIGHT_CSV_CHUNK_ROWS', '200000'))
+CSV_ALL_COLUMNS = os.environ.get('LOSIGHT_CSV_COLUMNS', '') == 'all'
+
+# Threads computing the DRGs of one /api/data/drg-drilldown request in parallel
+DRILLDOWN_WORKERS = int(os.environ.get('LOSIGHT_DRILLDOWN_WORKERS', str(min(4, os.cpu_count() or 1))))
+_drilldown_pool = None
+
+# Background warm-up of the result cache after each load (see warmup.py):
+# wall-clock and summed CPU budget in seconds (LOSIGHT_WARMUP_SECONDS=0
+# disables it), threads, and how many logged filter combinations to add
+WARMUP_SECONDS = float(os.environ.get('LOSIGHT_WARMUP_SECONDS', '60'))
+WARMUP_CPU_SECONDS = float(os.environ.get('LOSIGHT_WARMUP_CPU_SECONDS', '60'))
+WARMUP_WORKERS = int(os.environ.get('LOSIGHT_WARMUP_WORKERS', '2'))
+WARMUP_LOGGED = int(os.environ.get('LOSIGHT_WARMUP_LOGGED', '100'))
+warmup_scheduler = WarmupScheduler(WARMUP_WORKERS, WARMUP_SECONDS, WARMUP_CPU_SECONDS)
+
+# Requested filter combinations, counted across restarts to prioritize the warm-up
+REQUEST_LOG_PATH = os.environ.get('LOSIGHT_REQUEST_LOG',
+                                  os.path.join(DATA_CACHE_DIR, 'request_log.json') if DATA_CACHE_DIR else '')
+request_log = RequestLog(REQUEST_LOG_PATH)
+atexit.register(request_log.save)
 
 def download_csv_from_url(url, local_path):
-    """Download CSV file from cloud storage URL"""
+    """
+    Download CSV file from cloud storage URL.
+    Uses parallel range requests and resumes a previous partial download when
+    the server allows it; gzip/zstd sources are decompressed (see downloader.py).
+    """
     try:
         print(f"Downloading CSV from cloud storage...")
         print(f"URL: {url[:50]}...")  # Show first 50 chars for security
-        
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(local_path) if os.path.dirname(local_path) else '.', exist_ok=True)
-        
-        # Download with progress
-        with urllib.request.urlopen(url) as response:
-            total_size = int(response.headers.get('Content-Length', 0))
-            downloaded = 0
-            block_size = 8192
-            
-            with open(local_path, 'wb') as out_file:
-                while True:
-                    chunk = response.read(block_size)
-                    if not chunk:
-                        break
-                    out_file.write(chunk)
-                    downloaded += len(chunk)
-                    if total_size > 0:
-                        percent = (downloaded / total_size) * 100
-                        if downloaded % (10 * 1024 * 1024) == 0:  # Print every 10MB
-                            print(f"  Downloaded: {downloaded / (1024*1024):.1f} MB / {total_size / (1024*1024):.1f} MB ({percent:.1f}%)")
-        
+        download_file(url, local_path, sha256=CSV_SHA256 or None, workers=DOWNLOAD_WORKERS)
         print(f"✓ CSV downloaded successfully to: {local_path}")
         return True
     except Exception as e:
         print(f"✗ Error downloading CSV: {e}")
         return False
 
-def load_data():
-    """Load and prepare the dataset"""
-    global df
-    if df is not None:
-        return df
-    
+def record_startup(timings, phase, seconds):
+    timings[phase] = round(seconds, 4)
+
+@contextlib.contextmanager
+def startup_phase(timings, phase):
+    """Time a phase of a dataset load into timings"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup(timings, phase, time.perf_counter() - start)
+
+def find_csv(timings):
+    """Path of the dataset CSV, downloaded first when it is not found locally"""
     # Try multiple paths
-    data_paths = [
+    data_paths = [CSV_PATH] if CSV_PATH else []
+    data_paths += [
         os.path.join(BASE_DIR, '..', 'hospital_data_clean_base_all_drgs.csv'),
         os.path.join(BASE_DIR, 'hospital_data_clean_base_all_drgs.csv'),
         '../hospital_data_clean_base_all_drgs.csv',
@@ -85,7 +161,9 @@ def load_data():
     if csv_file is None and CSV_DOWNLOAD_URL:
         local_path = os.path.join(BASE_DIR, 'hospital_data_clean_base_all_drgs.csv')
         print(f"CSV not found locally. Attempting to download from cloud storage...")
-        if download_csv_from_url(CSV_DOWNLOAD_URL, local_path):
+        with startup_phase(timings, 'download'):
+            downloaded = download_csv_from_url(CSV_DOWNLOAD_URL, local_path)
+        if downloaded:
             csv_file = local_path
         else:
             print("Download failed. Please check the CSV_DOWNLOAD_URL environment variable.")
@@ -95,71 +173,388 @@ def load_data():
         if not CSV_DOWNLOAD_URL:
             error_msg += "\nTip: Set CSV_DOWNLOAD_URL environment variable to download from cloud storage"
         raise FileNotFoundError(error_msg)
+    return csv_file
+
+def source_signature(csv_file):
+    """CSV size and mtime plus the dataset cache manifest's mtime (None if the CSV is missing)"""
+    try:
+        stat = os.stat(csv_file)
+    except OSError:
+        return None
+    manifest = manifest_mtime(csv_file, DATA_CACHE_DIR) if DATA_CACHE_DIR else None
+    return (stat.st_size, stat.st_mtime_ns, manifest)
+
+def dataset_version_of(signature, csv_file, deltas):
+    """Identity of a dataset version, part of every result key and ETag"""
+    parts = [os.path.abspath(csv_file), signature[0], signature[1], FEATURE_SCHEMA_VERSION,
+             CSV_ALL_COLUMNS, RESPONSE_VERSION]
+    parts += [f"{d['path']}:{d['size']}:{d['mtime_ns']}" for d in deltas]
+    return hashlib.sha1(':'.join(map(str, parts)).encode('utf-8')).hexdigest()[:16]
+
+def write_cache(data, csv_file, timings, dtype_report, feature_timings, deltas):
+    if not DATA_CACHE_DIR:
+        return
+    try:
+        with startup_phase(timings, 'cache_write'):
+            cache_path = save_cached_frame(data, csv_file, DATA_CACHE_DIR,
+                                           metadata={'dtype_report': dtype_report,
+                                                     'feature_timings': feature_timings,
+                                                     'all_columns': CSV_ALL_COLUMNS,
+                                                     'deltas': deltas})
+        print(f"✓ Dataset cache written to: {cache_path}")
+    except Exception as e:
+        print(f"✗ Could not write dataset cache: {e}")
+
+def build_cubes(data, timings, previous=None, delta=None):
+    """Aggregation cubes for data, merged from previous and delta's rows when given"""
+    # Grouped LOS statistics are answered from the cube when it can be built
+    try:
+        with startup_phase(timings, 'cube'):
+            cubes = previous.appended(delta) if previous is not None else CubeSet.build(data)
+        print(f"✓ Aggregation cube built: {', '.join(f'{n:,}' for n in cubes.n_cells)} cells")
+        return cubes
+    except ValueError as e:
+        print(f"✗ Aggregation cube disabled: {e}")
+        return None
+
+def build_model(data, timings):
+    try:
+        with startup_phase(timings, 'model'):
+            return prediction.load_or_fit(data, MODEL_PATH)
+    except (ValueError, KeyError, np.linalg.LinAlgError) as e:
+        print(f"✗ Prediction model disabled: {e}")
+        return None
+
+def build_state():
+    """Load and prepare the dataset from its CSV (or the dataset cache)"""
+    timings = {}
+    load_started = time.perf_counter()
+    csv_file = find_csv(timings)
+    signature = source_signature(csv_file)
+    dtype_report = feature_timings = None
+    deltas = []
+    
+    # Reuse the prepared columns from a previous boot when the CSV is unchanged
+    data = None
+    if DATA_CACHE_DIR:
+        with startup_phase(timings, 'cache_load'):
+            data = load_cached_frame(csv_file, DATA_CACHE_DIR, mmap=DATA_CACHE_MMAP)
+        if data is not None:
+            metadata = load_cached_metadata(csv_file, DATA_CACHE_DIR)
+            if metadata.get('all_columns', False) != CSV_ALL_COLUMNS:
+                # Cache was built with a different column selection
+                data = None
+            else:
+                dtype_report = metadata.get('dtype_report')
+                feature_timings = metadata.get('feature_timings')
+                deltas = metadata.get('deltas', [])
+                print(f"✓ Data loaded from cache: {len(data):,} rows × {len(data.columns)} columns")
+    
+    if data is None:
+        print(f"Loading data from: {csv_file}")
+        start = time.perf_counter()
+        data, feature_timings, ingest_report = read_dataset(csv_file)
+        # Features are built chunk by chunk while parsing; report them apart
+        features_seconds = sum(feature_timings.values())
+        record_startup(timings, 'csv_parse', time.perf_counter() - start - features_seconds)
+        record_startup(timings, 'features', features_seconds)
+        print("✓ Features built: " + ', '.join(f"{name} {sec:.2f}s" for name, sec in feature_timings.items()))
+        
+        # Compact dtypes: categoricals, int8 flags, downcast codes and LOS
+        with startup_phase(timings, 'dtypes'):
+            # The chunks hold the parsed dtypes; this pass converts the DRG features
+            # and the columns outside the schema
+            dtype_report = merge_reports(ingest_report, optimize_dtypes(data))
+        print(f"✓ Memory: {dtype_report['total_bytes_after'] / 1e6:.1f} MB after dtype optimization")
+        # Rows grouped by DRG, so that a DRG filter selects a contiguous slice
+        with startup_phase(timings, 'drg_sort'):
+            data = sort_by_drg(data)
+        write_cache(data, csv_file, timings, dtype_report, feature_timings, deltas)
+        print(f"✓ Data loaded: {len(data):,} rows × {len(data.columns)} columns")
+    
+    # Row-id index used by apply_filters()
+    with startup_phase(timings, 'filter_index'):
+        filter_index = FilterIndex.build(data)
+    cubes = build_cubes(data, timings)
+    model = build_model(data, timings)
+    
+    signature = signature[:2] + source_signature(csv_file)[2:]
+    record_startup(timings, 'total', time.perf_counter() - load_started)
+    return DatasetState(data, csv_file, filter_index, cubes, model,
+                        dataset_version_of(signature, csv_file, deltas), signature,
+                        dtype_report=dtype_report, feature_timings=feature_timings,
+                        timings=timings, deltas=deltas)
+
+def append_state(state, delta_file):
+    """
+    New state with the rows of delta_file (a CSV with the same columns)
+    appended to those of state. DRG features, filter index and cube are
+    merged from state rather than rebuilt; the model is refitted.
+    """
+    timings = {}
+    load_started = time.perf_counter()
+    print(f"Appending rows from: {delta_file}")
+    stat = os.stat(delta_file)
+    start = time.perf_counter()
+    delta, _, delta_report = read_rows(delta_file)
+    record_startup(timings, 'csv_parse', time.perf_counter() - start)
+    if not len(delta):
+        raise ValueError(f'{delta_file} has no rows with a positive Length of Stay')
+    # The appended rows form a segment of their own, grouped by DRG
+    with startup_phase(timings, 'drg_sort'):
+        delta = sort_by_drg(delta)
     
-    print(f"Loading data from: {csv_file}")
-    df = pd.read_csv(csv_file, low_memory=False)
+    with startup_phase(timings, 'features'):
+        # Dataset-wide DRG features change for every row: merge the histograms
+        stats = state.drg_stats()
+        if stats is not None:
+            stats = stats.merge(DRGStats.from_frame(delta))
+            stats.assign(delta)
+    with startup_phase(timings, 'merge'):
+        data = append_frame(state.df, delta)
+        if stats is not None:
+            stats.assign(data)
+    with startup_phase(timings, 'dtypes'):
+        dtype_report = merge_reports(sum_reports([state.dtype_report, delta_report]), optimize_dtypes(data))
     
-    # Clean LOS
-    df = df[df['Length of Stay'] > 0].copy()
+    deltas = state.deltas + [{'path': os.path.abspath(delta_file), 'size': stat.st_size,
+                              'mtime_ns': stat.st_mtime_ns, 'rows': len(delta)}]
+    write_cache(data, state.csv_file, timings, dtype_report, state.feature_timings, deltas)
     
-    # Create features
-    create_features(df)
+    with startup_phase(timings, 'filter_index'):
+        filter_index = state.filter_index.appended(delta)
+    cubes = build_cubes(data, timings, state.cubes, delta)
+    model = build_model(data, timings)
     
-    print(f"✓ Data loaded: {len(df):,} rows × {len(df.columns)} columns")
-    return df
+    signature = state.signature[:2] + source_signature(state.csv_file)[2:]
+    record_startup(timings, 'total', time.perf_counter() - load_started)
+    print(f"✓ Appended {len(delta):,} rows: {len(data):,} rows in total")
+    return DatasetState(data, state.csv_file, filter_index, cubes, model,
+                        dataset_version_of(signature, state.csv_file, deltas), signature,
+                        dtype_report=dtype_report, feature_timings=state.feature_timings,
+                        timings=timings, deltas=deltas, drg_stats=stats)
+
+def swap_state(state):
+    """Serve state to new requests; requests already running keep the previous one"""
+    global dataset_state
+    dataset_state = state
+    # Results of the previous dataset are no longer valid (their keys carry its version)
+    result_cache.clear()
+    metrics.DATASET_ROWS.set((), len(state.df))
+    metrics.STARTUP_SECONDS.clear()
+    for phase, seconds in state.timings.items():
+        metrics.STARTUP_SECONDS.set((phase,), seconds)
+    print(f"✓ Dataset version {state.version} active: {len(state.df):,} rows")
+    start_warmup(state)
+
+def load_state():
+    """The latest dataset state, loading it on first use"""
+    if dataset_state is None:
+        with _load_lock:
+            if dataset_state is None:
+                swap_state(build_state())
+    return dataset_state
+
+def current_state():
+    """
+    Dataset state of the current request: pinned on first use, so a reload
+    never changes the data under a running request. Outside requests this is
+    the latest state.
+    """
+    if not has_request_context():
+        return load_state()
+    state = g.get('dataset_state')
+    if state is None:
+        state = g.dataset_state = load_state()
+    return state
+
+def load_data():
+    """Load the dataset on first use and return the current request's frame"""
+    return current_state().df
+
+def reload_dataset():
+    """Build the dataset again from the CSV (or a fresh dataset cache) and swap it in"""
+    previous = dataset_state
+    state = build_state()
+    if previous is not None and state.csv_file == previous.csv_file and state.signature[:2] == previous.signature[:2]:
+        # Same CSV: keep the appended deltas that the dataset cache did not hold
+        loaded = {d['path'] for d in state.deltas}
+        for delta in previous.deltas:
+            if delta['path'] not in loaded and os.path.exists(delta['path']):
+                state = append_state(state, delta['path'])
+    swap_state(state)
+
+def append_dataset(delta_file):
+    """Append the rows of delta_file to the latest dataset and swap the result in"""
+    swap_state(append_state(load_state(), delta_file))
+
+def start_watcher():
+    """Watch the CSV and dataset cache of this process's dataset (LOSIGHT_WATCH_INTERVAL)"""
+    global watcher
+    if not WATCH_INTERVAL or (watcher is not None and watcher.running()):
+        return
+    
+    def on_change():
+        if not reloader.busy():
+            print("Dataset source changed; reloading in the background")
+            reloader.submit('reload', reload_dataset, reason='watch')
+    
+    watcher = SourceWatcher(lambda: source_signature(load_state().csv_file),
+                            lambda: load_state().signature, on_change, WATCH_INTERVAL).start()
+
+def extract_age(age_str):
+    """Lower bound of an 'Age Group' label such as '50-69' or '70 or Older'"""
+    if pd.isna(age_str):
+        return np.nan
+    age_str = str(age_str).strip()
+    if '-' in age_str:
+        try:
+            return int(age_str.split('-')[0])
+        except ValueError:
+            return np.nan
+    elif '+' in age_str or 'or' in age_str.lower():
+        numbers = re.findall(r'\d+', age_str)
+        if numbers:
+            return int(numbers[0])
+    return np.nan
+
+# Flag columns derived from text columns: source column -> {flag: regex}
+# (matched case-insensitively, missing values give 0)
+TEXT_FLAGS = {
+    'Payment_Type': {
+        'Is_Medicaid': 'Medicaid',
+        'Is_Medicare': 'Medicare',
+        'Is_Private_Insurance': 'Private',
+    },
+    'Patient Disposition': {
+        'Needs_Skilled_Nursing': 'Skilled Nursing',
+        'Needs_Rehab': 'Rehab',
+        'Discharge_Home': 'Home',
+    },
+    'Type of Admission': {
+        'Is_Emergency': 'Emergency|Trauma',
+    },
+}
+
+# APR Risk of Mortality labels -> APR_Risk_Mortality_Ordinal
+MORTALITY_ORDINAL = {'Minor': 1, 'Moderate': 2, 'Major': 3, 'Extreme': 4}
+
+def map_distinct(series, func, dtype=None):
+    """
+    Apply func once per distinct value of series and broadcast the results to
+    every row through the value codes. Missing values map to func(np.nan).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    # Code -1 (missing) picks the trailing entry
+    mapped = np.array([func(v) for v in uniques] + [func(np.nan)], dtype=dtype)
+    return mapped[codes]
+
+def read_rows(csv_file):
+    """
+    Stream the CSV in chunks: each chunk is cleaned, gets its row-level
+    features and the compact dtypes of the schema columns, and is appended to
+    preallocated columns (see ingest.py). Columns outside the schema keep
+    their parsed dtype, to be converted on the whole frame. Returns the
+    frame, the time spent per derived feature in seconds and the memory
+    report of the chunks' dtype conversion.
+    """
+    timings = {}
+    reports = []
+    parsed = csv_dtypes()
+    
+    def prepare(chunk):
+        # Clean LOS
+        chunk = chunk[chunk['Length of Stay'] > 0].reset_index(drop=True)
+        for name, sec in create_row_features(chunk).items():
+            timings[name] = round(timings.get(name, 0) + sec, 4)
+        reports.append(optimize_dtypes(chunk, columns=COLUMN_SCHEMA, parsed_categories=parsed))
+        return chunk
+    
+    usecols = None if CSV_ALL_COLUMNS else (lambda col: col in COLUMN_SCHEMA)
+    data = read_csv_chunked(csv_file, prepare, usecols=usecols, dtype=parsed,
+                            chunksize=CSV_CHUNK_ROWS)
+    return data, timings, sum_reports(reports)
+
+def read_dataset(csv_file):
+    """
+    The prepared dataset from csv_file: rows and row-level features from
+    read_rows(), then the DRG features, which need every row.
+    """
+    data, timings, report = read_rows(csv_file)
+    timings.update(create_drg_features(data))
+    return data, timings, report
 
 def create_features(df):
     """
     Create derived features from original dataset columns.
     Only creates features from columns that exist in hospital_data_clean_base_all_drgs.csv.
     All features are derived from original columns, not pre-engineered.
+    Returns the time spent per derived feature (group) in seconds.
+    """
+    timings = create_row_features(df)
+    timings.update(create_drg_features(df))
+    return timings
+
+def _timer(timings):
+    def timed(name, start):
+        timings[name] = round(time.perf_counter() - start, 4)
+    return timed
+
+def create_row_features(df):
     """
+    Features that depend only on the row itself, so they can be built chunk by chunk.
+    Text-derived features are computed once per distinct value, so the cost
+    scales with the number of categories rather than rows.
+    """
+    timings = {}
+    timed = _timer(timings)
+    
     # Age_Numeric - extract from Age Group if not already present
     if 'Age_Numeric' not in df.columns and 'Age Group' in df.columns:
-        def extract_age(age_str):
-            if pd.isna(age_str):
-                return np.nan
-            age_str = str(age_str).strip()
-            if '-' in age_str:
-                try:
-                    return int(age_str.split('-')[0])
-                except:
-                    return np.nan
-            elif '+' in age_str or 'or' in age_str.lower():
-                import re
-                numbers = re.findall(r'\d+', age_str)
-                if numbers:
-                    try:
-                        return int(numbers[0])
-                    except:
-                        return np.nan
-            return np.nan
-        df['Age_Numeric'] = df['Age Group'].apply(extract_age)
+        start = time.perf_counter()
+        df['Age_Numeric'] = map_distinct(df['Age Group'], extract_age, dtype=np.float64)
+        timed('Age_Numeric', start)
     
     # Binary features
     if 'Is_Senior' not in df.columns and 'Age_Numeric' in df.columns:
-        df['Is_Senior'] = (df['Age_Numeric'] >= 70).astype(int)
-    
-    if 'Is_Medicaid' not in df.columns and 'Payment_Type' in df.columns:
-        df['Is_Medicaid'] = (df['Payment_Type'].str.contains('Medicaid', case=False, na=False)).astype(int)
-        df['Is_Medicare'] = (df['Payment_Type'].str.contains('Medicare', case=False, na=False)).astype(int)
-        df['Is_Private_Insurance'] = (df['Payment_Type'].str.contains('Private', case=False, na=False)).astype(int)
+        start = time.perf_counter()
+        df['Is_Senior'] = (df['Age_Numeric'] >= 70).astype(np.int8)
+        timed('Is_Senior', start)
     
-    if 'Needs_Skilled_Nursing' not in df.columns and 'Patient Disposition' in df.columns:
-        df['Needs_Skilled_Nursing'] = (df['Patient Disposition'].str.contains('Skilled Nursing', case=False, na=False)).astype(int)
-        df['Needs_Rehab'] = (df['Patient Disposition'].str.contains('Rehab', case=False, na=False)).astype(int)
-        df['Discharge_Home'] = (df['Patient Disposition'].str.contains('Home', case=False, na=False)).astype(int)
+    for source, flags in TEXT_FLAGS.items():
+        missing = [flag for flag in flags if flag not in df.columns]
+        if source not in df.columns or not missing:
+            continue
+        # One pass over the distinct values produces every flag of this column
+        start = time.perf_counter()
+        patterns = [re.compile(flags[flag], re.IGNORECASE) for flag in missing]
+        matrix = map_distinct(
+            df[source],
+            lambda v: [0 if pd.isna(v) else int(bool(p.search(str(v)))) for p in patterns],
+            dtype=np.int8,
+        )
+        for i, flag in enumerate(missing):
+            df[flag] = matrix[:, i]
+        timed('+'.join(missing), start)
     
-    if 'Is_Emergency' not in df.columns and 'Type of Admission' in df.columns:
-        df['Is_Emergency'] = (df['Type of Admission'].str.contains('Emergency|Trauma', case=False, na=False)).astype(int)
-        df['Is_Elective'] = (df['Type of Admission'] == 'Elective').astype(int)
+    if 'Is_Elective' not in df.columns and 'Type of Admission' in df.columns:
+        start = time.perf_counter()
+        df['Is_Elective'] = map_distinct(df['Type of Admission'], lambda v: int(v == 'Elective'), dtype=np.int8)
+        timed('Is_Elective', start)
     
     # Ordinal risk
     if 'APR_Risk_Mortality_Ordinal' not in df.columns and 'APR Risk of Mortality' in df.columns:
-        mortality_map = {'Minor': 1, 'Moderate': 2, 'Major': 3, 'Extreme': 4}
-        df['APR_Risk_Mortality_Ordinal'] = df['APR Risk of Mortality'].map(mortality_map)
+        start = time.perf_counter()
+        df['APR_Risk_Mortality_Ordinal'] = map_distinct(
+            df['APR Risk of Mortality'], lambda v: MORTALITY_ORDINAL.get(v, np.nan), dtype=np.float64
+        )
+        timed('APR_Risk_Mortality_Ordinal', start)
     
     # Interaction features
+    start = time.perf_counter()
     if 'Severity_x_Senior' not in df.columns and 'APR Severity of Illness Code' in df.columns and 'Is_Senior' in df.columns:
         df['Severity_x_Senior'] = df['APR Severity of Illness Code'] * df['Is_Senior']
     
@@ -168,50 +563,482 @@ def create_features(df):
     
     if 'Severity_x_Medicaid' not in df.columns and 'APR Severity of Illness Code' in df.columns and 'Is_Medicaid' in df.columns:
         df['Severity_x_Medicaid'] = df['APR Severity of Illness Code'] * df['Is_Medicaid']
+    timed('interactions', start)
     
-    # DRG features
+    return timings
+
+def create_drg_features(df):
+    """DRG frequency and median LOS, which depend on every row of the dataset"""
+    timings = {}
+    timed = _timer(timings)
     if 'APR DRG Code' in df.columns:
-        df['DRG_freq'] = df['APR DRG Code'].map(df['APR DRG Code'].value_counts())
-        _drg_median = df.groupby('APR DRG Code')['Length of Stay'].median()
-        df['DRG_Median_LOS'] = df['APR DRG Code'].map(_drg_median)
+        # From per-DRG LOS histograms, which appends update (see dataset_state.py)
+        start = time.perf_counter()
+        DRGStats.from_frame(df).assign(df)
+        timed('DRG_freq+DRG_Median_LOS', start)
+    
+    return timings
 
-def apply_filters():
-    """Apply filters from request parameters"""
-    df_full = load_data()
-    df_filtered = df_full.copy()
+class InvalidParameter(ValueError):
+    """A query parameter that cannot be used; answered with 400 and the message"""
+
+@app.errorhandler(InvalidParameter)
+def invalid_parameter(e):
+    return jsonify({'error': str(e)}), 400
+
+def number_param(args, name, default=None, cast=float, minimum=None, maximum=None):
+    """
+    Query parameter `name` as a finite number (an integer with cast=int)
+    within [minimum, maximum], or default when it is not set. Raises
+    InvalidParameter otherwise.
+    """
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        kind = 'an integer' if cast is int else 'a number'
+        raise InvalidParameter(f'{name} must be {kind}, got {raw!r}') from None
+    if not math.isfinite(value) or (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        if minimum is not None and maximum is not None:
+            bounds = f'between {minimum} and {maximum}'
+        elif minimum is not None:
+            bounds = f'at least {minimum}'
+        elif maximum is not None:
+            bounds = f'at most {maximum}'
+        else:
+            bounds = 'finite'
+        raise InvalidParameter(f'{name} must be {bounds}, got {raw!r}')
+    return value
+
+def parse_drgs(raw, name='drg'):
+    """
+    One DRG code, or a sorted tuple for a comma-separated list of several.
+    Raises InvalidParameter (naming parameter `name`) for anything else.
+    """
+    try:
+        codes = sorted({int(code) for code in raw.split(',') if code.strip()})
+    except ValueError:
+        codes = None
+    if not codes:
+        raise InvalidParameter(f'{name} must be one or more comma-separated DRG codes, got {raw!r}')
+    return codes[0] if len(codes) == 1 else tuple(codes)
+
+def get_filters(args=None):
+    """
+    Canonical filter values from request parameters.
+    Unset filters and 'all' map to None; the LOS range only applies when both
+    bounds are given. drg=194,720 selects several DRGs (see parse_drgs()).
+    Values that cannot be parsed raise InvalidParameter.
+    """
+    args = request.args if args is None else args
     
-    # Severity filter
-    severity = request.args.get('severity')
-    if severity and severity != 'all' and 'APR Severity of Illness Code' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['APR Severity of Illness Code'] == int(severity)]
+    def value(name, cast=str):
+        raw = args.get(name)
+        if not raw or raw == 'all':
+            return None
+        if cast is int:
+            return number_param(args, name, cast=int)
+        return cast(raw)
     
+    filters = {
+        'severity': value('severity', int),
+        'payment': value('payment'),
+        'admission': value('admission'),
+        'drg': value('drg', parse_drgs),
+        'los_min': None,
+        'los_max': None,
+    }
     # Age filter removed - data is pre-filtered to adults (18+) only
+    los_min = number_param(args, 'los_min')
+    los_max = number_param(args, 'los_max')
+    if los_min is not None and los_max is not None:
+        filters['los_min'] = float(los_min)
+        filters['los_max'] = float(los_max)
+    return filters
+
+def request_phase(name):
+    """Time a phase of the current request (no-op outside requests)"""
+    timer = g.get('timer') if has_request_context() else None
+    return timer.phase(name) if timer is not None else contextlib.nullcontext()
+
+def count_rows_scanned(n):
+    """Add n dataset rows to the current request's rows-scanned count"""
+    timer = g.get('timer') if has_request_context() else None
+    if timer is not None:
+        timer.rows_scanned += n
+
+def selected_rows():
+    """
+    Row ids matching the request's filters (None for all rows).
+    Resolved once per request, so panels built together share the selection.
+    """
+    key = tuple(sorted(get_filters().items()))
+    cached = g.get('selected_rows')
+    if cached is None or cached[0] != key:
+        with request_phase('filter'):
+            cached = (key, current_state().filter_index.select(dict(key)))
+        g.selected_rows = cached
+    return cached[1]
+
+def apply_filters(columns=None):
+    """
+    Apply filters from request parameters.
+    Rows are resolved through the filter index, so only the matching rows of
+    the requested columns are materialized. With no active filters the
+    dataset itself is returned, so callers must not modify the result.
+    """
+    df_full = load_data()
+    rows = selected_rows()
+    data = df_full if columns is None else df_full[[c for c in columns if c in df_full.columns]]
+    if rows is None:
+        count_rows_scanned(len(data))
+        return data
+    count_rows_scanned(len(rows))
+    with request_phase('filter'):
+        # Single DRGs are contiguous (see sort_by_drg()): slice instead of gathering
+        part = as_slice(rows)
+        return data.iloc[part] if part is not None else data.take(rows)
+
+def grouped_los_stats(by):
+    """
+    Median, mean and count of LOS per group of the cube dimensions in by
+    (see aggregation_cube.DIMENSION_COLUMNS) for the request's filters.
+    Answered from the aggregation cube when possible, otherwise by grouping
+    the filtered rows. Returns None if a dimension's column is missing.
+    """
+    df_full = load_data()
+    filters = get_filters()
+    agg_cubes = current_state().cubes
+    if agg_cubes is not None:
+        stats = agg_cubes.group_stats(by, filters)
+        if stats is not None:
+            return stats
     
-    # Payment filter
-    payment = request.args.get('payment')
-    if payment and payment != 'all' and 'Payment_Type' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['Payment_Type'] == payment]
+    columns = [DIMENSION_COLUMNS[d] for d in by]
+    if any(c not in df_full.columns for c in columns):
+        return None
+    df_filtered = apply_filters(columns + ['Length of Stay'])
+    keys = [dimension_series(df_filtered, d) for d in by]
+    return df_filtered.groupby(keys, observed=True)['Length of Stay'].agg(['median', 'mean', 'count']).reset_index()
+
+def los_value_counts():
+    """
+    Distinct LOS values and their counts for the request's filters, from the
+    aggregation cube when possible, otherwise from the filtered rows.
+    """
+    filters = get_filters()
+    agg_cubes = current_state().cubes
+    cube = agg_cubes.for_query([], filters) if agg_cubes is not None else None
+    if cube is not None:
+        _, hist = cube.histograms([], filters)
+        counts = hist[0] if len(hist) else np.zeros(len(cube.los_values))
+        return cube.los_values, counts.astype(np.int64)
+    los = apply_filters(['Length of Stay'])['Length of Stay'].to_numpy()
+    return np.unique(los, return_counts=True)
+
+def los_summary(qs=()):
+    """
+    Summary statistics and quantiles qs of the filtered LOS, computed in one
+    pass over the merged LOS histogram (see histogram_summary()).
+    """
+    values, counts = los_value_counts()
+    return histogram_summary(values, counts, qs)
+
+def filtered_los():
+    """LOS values of the rows matching the request's filters, as a NumPy array"""
+    los = load_data()['Length of Stay'].to_numpy()
+    rows = selected_rows()
+    count_rows_scanned(len(los) if rows is None else len(rows))
+    if rows is None:
+        return los
+    with request_phase('filter'):
+        part = as_slice(rows)
+        return los[part] if part is not None else los[rows]
+
+# Outlier scatter plot: point budget, and the share of it that each outlier
+# class may claim even when it is rarer than that
+OUTLIER_MAX_POINTS = 5000
+OUTLIER_MIN_SHARE = 0.2
+
+def stratified_sample(strata, max_points, min_share, rng):
+    """
+    Sample positions from each stratum (arrays of positions), up to max_points
+    in total. Every stratum but the last gets its proportional share, raised
+    to min_share of the budget (capped at its size); the last stratum takes
+    the remainder. Each result is sorted.
+    """
+    total = sum(len(stratum) for stratum in strata)
+    if total <= max_points:
+        return list(strata)
+    remaining = max_points
+    sampled = []
+    for i, stratum in enumerate(strata):
+        if i == len(strata) - 1:
+            size = min(len(stratum), remaining)
+        else:
+            proportional = round(max_points * len(stratum) / total)
+            size = min(len(stratum), max(proportional, int(max_points * min_share)), remaining)
+        remaining -= size
+        sampled.append(np.sort(rng.choice(stratum, size=size, replace=False)))
+    return sampled
+
+def point_arrays(index, los):
+    """Scatter points as records, or as parallel arrays for format=columnar"""
+    if request.args.get('format') == 'columnar':
+        return {'index': array_payload(index), 'los': array_payload(los)}
+    return [{'index': i, 'Length of Stay': v} for i, v in zip(index.tolist(), los.tolist())]
+
+def array_payload(values):
+    """Numeric array for a response: a list, or base64-encoded bytes with binary=1"""
+    if request.args.get('binary') == '1':
+        return response_encoding.binary_array(values)
+    return np.asarray(values).tolist()
+
+def table_payload(frame):
+    """
+    Rows of frame for a response: a list of records by default, or with
+    format=columnar one array per column (numeric ones via array_payload())
+    """
+    if request.args.get('format') != 'columnar':
+        return frame.to_dict('records')
+    return {
+        col: array_payload(frame[col].to_numpy()) if pd.api.types.is_numeric_dtype(frame[col]) else frame[col].tolist()
+        for col in frame.columns
+    }
+
+def exact_requested():
+    """exact=true asks for statistics computed from the filtered rows themselves"""
+    return request.args.get('exact') == 'true'
+
+# Largest number of bins a histogram response may have
+MAX_HISTOGRAM_BINS = 1000
+
+def los_histogram_bins(args, values=None, counts=None):
+    """
+    Binned LOS counts for the request's filters, or of the histogram given by
+    values and counts.
     
-    # Admission filter
-    admission = request.args.get('admission')
-    if admission and admission != 'all' and 'Type of Admission' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['Type of Admission'] == admission]
+    Bins are chosen by (in order of precedence):
+      edges=0,1,2,5,10   explicit, comma-separated bin edges
+      log=true           `bins` log-spaced bins from 1 day up to the maximum
+      bin_width=2        fixed-width bins starting at 0
+      bins=40            `bins` equal integer-width bins starting at 0 (default)
+    max_los caps the range. Stays outside the binned range are counted in
+    `below` and `above`. At most MAX_HISTOGRAM_BINS bins are returned; other
+    parameters raise InvalidParameter.
+    """
+    max_los = number_param(args, 'max_los', minimum=0)
+    n_bins = number_param(args, 'bins', 40, cast=int, minimum=1, maximum=MAX_HISTOGRAM_BINS)
+    bin_width = number_param(args, 'bin_width')
+    if bin_width is not None and bin_width <= 0:
+        raise InvalidParameter(f"bin_width must be positive, got {args['bin_width']!r}")
+    edges = None
+    if args.get('edges'):
+        parts = args['edges'].split(',')
+        if len(parts) > MAX_HISTOGRAM_BINS + 1:
+            raise InvalidParameter(f'edges may list at most {MAX_HISTOGRAM_BINS + 1} values')
+        try:
+            edges = np.array(sorted({float(e) for e in parts}))
+        except ValueError:
+            raise InvalidParameter(f"edges must be comma-separated numbers, got {args['edges']!r}") from None
+        if len(edges) < 2 or not np.isfinite(edges).all():
+            raise InvalidParameter('edges must list at least two distinct finite numbers')
     
-    # DRG filter
-    drg = request.args.get('drg')
-    if drg and drg != 'all' and 'APR DRG Code' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['APR DRG Code'] == int(drg)]
+    if values is None:
+        values, counts = los_value_counts()
+    values = values.astype(np.float64)
+    present = values[counts > 0]
+    upper = float(present.max()) if len(present) else 0.0
+    if max_los is not None:
+        upper = min(upper, float(max_los))
     
-    # LOS filter
-    los_min = request.args.get('los_min')
-    los_max = request.args.get('los_max')
-    if los_min and los_max:
-        df_filtered = df_filtered[
-            (df_filtered['Length of Stay'] >= float(los_min)) & 
-            (df_filtered['Length of Stay'] <= float(los_max))
-        ]
+    if edges is not None:
+        bin_width = None
+    elif args.get('log') == 'true':
+        bin_width = None
+        edges = np.geomspace(1.0, max(upper, 1.0) + 1, n_bins + 1)
+    else:
+        if bin_width is None:
+            bin_width = max(float(np.ceil(upper / n_bins)), 1.0)
+        elif upper // bin_width + 1 > MAX_HISTOGRAM_BINS:
+            raise InvalidParameter(f'bin_width {bin_width:g} gives more than {MAX_HISTOGRAM_BINS} bins')
+        edges = np.arange(int(upper // bin_width) + 2) * bin_width
     
-    return df_filtered
+    limit = min(upper, edges[-1])
+    in_range = (values >= edges[0]) & (values <= limit)
+    binned, _ = np.histogram(values[in_range], bins=edges, weights=counts[in_range])
+    return {
+        'edges': array_payload(edges),
+        'counts': array_payload(binned.astype(np.int64)),
+        'bin_width': bin_width,
+        'total': int(counts.sum()),
+        'below': int(counts[values < edges[0]].sum()),
+        'above': int(counts[values > limit].sum()),
+    }
+
+# Panel name -> (builder, extra query parameters); filled by @cached_panel
+PANELS = {}
+
+# Query parameters that change the encoding of every panel
+RESPONSE_PARAMS = ('format', 'binary')
+
+def panel_key(panel):
+    """Result cache key: dataset version, panel name, canonical filters and parameter values"""
+    _, params = PANELS[panel]
+    return (
+        current_state().version,
+        panel,
+        tuple(sorted(get_filters().items())),
+        tuple(request.args.get(p) for p in params + RESPONSE_PARAMS),
+    )
+
+def panel_body(panel):
+    """
+    JSON body of a panel for the current request and whether it came from
+    result_cache (see panel_key()).
+    """
+    builder, _ = PANELS[panel]
+    load_data()
+    key = panel_key(panel)
+    body = result_cache.get(key)
+    if body is not None:
+        return body, True
+    with request_phase('aggregate'):
+        payload = builder()
+    with request_phase('serialize'):
+        body = response_encoding.dumps(payload)
+    result_cache.put(key, body)
+    return body, False
+
+def etag_for(key, encoding):
+    """Strong ETag of a result: its key (which includes the dataset version) and content encoding"""
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:24]
+    return f'{digest}-{encoding}' if encoding else digest
+
+def send_cached_json(key, compute):
+    """
+    Response for the result identified by key. Answers 304 when the client
+    already holds it (If-None-Match); otherwise compute() gives (body, hit)
+    and the body is compressed per Accept-Encoding, with the compressed
+    bytes kept in result_cache as well.
+    """
+    load_data()
+    encoding = response_encoding.negotiate(request.headers.get('Accept-Encoding'))
+    etag = etag_for(key, encoding)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        body, hit = compute()
+        if encoding:
+            with request_phase('compress'):
+                body = result_cache.get_or_compute(
+                    ('encoded', encoding, key), lambda: response_encoding.compress(body, encoding))
+            response = app.response_class(body, mimetype='application/json')
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = app.response_class(body, mimetype='application/json')
+        if hit is not None:
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    response.set_etag(etag)
+    # Browsers keep the response but revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def cached_panel(panel, params=()):
+    """
+    Register a view as dashboard panel `panel`. The view returns the payload
+    dict; responses are served from result_cache and the panel can also be
+    requested through /api/data/batch.
+    """
+    def decorator(builder):
+        PANELS[panel] = (builder, tuple(params))
+        
+        @functools.wraps(builder)
+        def wrapper():
+            load_data()
+            return send_cached_json(panel_key(panel), lambda: panel_body(panel))
+        return wrapper
+    return decorator
+
+# Query parameters the dashboard sends with every panel request (PANEL_PARAMS in static/app.js)
+DASHBOARD_PARAMS = 'mode=histogram&max_los=50&bins=40&format=columnar&binary=1'
+# Panels the dashboard loads on every filter change (TAB_PANELS in static/app.js)
+DASHBOARD_PANELS = ('overview', 'los-distribution', 'severity', 'severity-senior', 'demographics',
+                    'payment', 'admission', 'disposition', 'top-drgs', 'outliers')
+
+def filter_query(filters):
+    """Canonical query string of the set filters; the request log's key"""
+    return urlencode(sorted(
+        (name, ','.join(map(str, value)) if isinstance(value, tuple) else value)
+        for name, value in filters.items() if value is not None
+    ))
+
+def warmup_plan(state):
+    """
+    Filter query strings to warm, most likely first: the unfiltered view, the
+    logged combinations by request count, then the remaining single filter
+    values in the order /api/filters/options lists them.
+    """
+    options = filter_options(state)
+    queries = [''] + [filter_query({name: value})
+                      for name in ('severity', 'payment', 'admission', 'drg')
+                      for value in options.get(name, [])]
+    logged = dict(request_log.top(WARMUP_LOGGED))
+    rank = {query: i for i, query in enumerate(queries)}
+    queries += [query for query in logged if query not in rank]
+    return sorted(queries, key=lambda q: (q != '', -logged.get(q, 0), rank.get(q, len(rank))))
+
+def warm_panels(state, path, panels):
+    """Compute panels for the request path into result_cache, against state"""
+    with app.test_request_context(path):
+        g.dataset_state = state
+        for panel in panels:
+            panel_body(panel)
+
+def warmup_stop_reason():
+    # Leave room in the result cache for the entries users create
+    if result_cache.size_bytes >= 0.9 * result_cache.max_bytes:
+        return 'result cache full'
+    return None
+
+def start_warmup(state):
+    """Warm the result cache for state in the background, replacing any earlier warm-up"""
+    if WARMUP_SECONDS <= 0 or not result_cache.enabled:
+        return
+    # Only what the dashboard shows: other panels would spend the budget on results nobody reads
+    panels = [p for p in DASHBOARD_PANELS if p in PANELS]
+    tasks = [functools.partial(warm_panels, state, '/api/filters/options', ['filter-options'])]
+    tasks += [functools.partial(warm_panels, state, f"/api/data/batch?{DASHBOARD_PARAMS}{'&' + q if q else ''}", panels)
+              for q in warmup_plan(state)]
+    warmup_scheduler.start(state.version, tasks, stop=warmup_stop_reason)
+    print(f"✓ Warm-up started: {len(tasks) - 1} filter combinations")
+
+@app.before_request
+def start_request_timer():
+    g.timer = metrics.RequestTimer()
+    start_watcher()
+    if PROFILING and request.args.get('profile') == '1':
+        g.profiler = metrics.SamplingProfiler(threading.get_ident()).start()
+
+@app.after_request
+def record_request_metrics(response):
+    """Per-endpoint metrics and Server-Timing header; ?profile=1 returns the profile instead"""
+    timer = g.get('timer')
+    if timer is None or request.endpoint == 'static':
+        return response
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    total = timer.observe(endpoint, response.content_length or 0)
+    if request.path.startswith('/api/data/') and response.status_code in (200, 304):
+        request_log.record(filter_query(get_filters()))
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        response = app.response_class(profiler.collapsed(), mimetype='text/plain')
+    response.headers['Server-Timing'] = timer.server_timing(total)
+    return response
 
 # Routes
 @app.route('/')
@@ -227,23 +1054,45 @@ def test():
 @app.route('/api/dataset-info')
 def dataset_info():
     """Return information about the loaded dataset"""
-    global df
-    if df is None:
-        load_data()
+    state = current_state()
     return jsonify({
         'dataset_name': 'hospital_data_clean_base_all_drgs.csv',
-        'rows': len(df),
-        'columns': len(df.columns),
-        'columns_list': list(df.columns),
-        'sample_size': '1,892,838 rows (all DRGs included)'
+        'rows': len(state.df),
+        'columns': len(state.df.columns),
+        'columns_list': list(state.df.columns),
+        'sample_size': '1,892,838 rows (all DRGs included)',
+        'memory': state.dtype_report,
+        'feature_timings': state.feature_timings,
+        'startup_timings': state.timings,
+        'dataset_version': state.version,
+        'loaded_at': state.loaded_at,
+        'appended_rows': sum(d['rows'] for d in state.deltas)
     })
 
 @app.route('/api/data/overview')
+@cached_panel('overview', params=('exact',))
 def get_overview():
-    """Get overview statistics"""
-    df_filtered = apply_filters()
+    """Get overview statistics (exact=true computes them from the filtered rows)"""
+    if not exact_requested():
+        summary = los_summary((0.5, 0.25, 0.75, 0.95, 0.99))
+        median, q25, q75, q95, q99 = summary['quantiles']
+        return {
+            'total_patients': summary['count'],
+            'median_los': median,
+            'mean_los': summary['mean'],
+            'std_los': summary['std'],
+            'min_los': summary['min'],
+            'max_los': summary['max'],
+            'q25': q25,
+            'q75': q75,
+            'q95': q95,
+            'q99': q99,
+            'skewness': summary['skew']
+        }
     
-    return jsonify({
+    df_filtered = apply_filters(['Length of Stay'])
+    
+    return {
         'total_patients': len(df_filtered),
         'median_los': float(df_filtered['Length of Stay'].median()),
         'mean_los': float(df_filtered['Length of Stay'].mean()),
@@ -255,154 +1104,294 @@ def get_overview():
         'q95': float(df_filtered['Length of Stay'].quantile(0.95)),
         'q99': float(df_filtered['Length of Stay'].quantile(0.99)),
         'skewness': float(df_filtered['Length of Stay'].skew())
-    })
+    }
+
+# LOS values returned by /api/data/los-distribution in raw mode
+LOS_SAMPLE_SIZE = 50000
 
 @app.route('/api/data/los-distribution')
+@cached_panel('los-distribution', params=('mode', 'bins', 'bin_width', 'edges', 'log', 'max_los', 'seed'))
 def get_los_distribution():
-    """Get LOS distribution for histogram"""
-    df_filtered = apply_filters()
-    los_data = df_filtered['Length of Stay'].values.tolist()
+    """
+    Get LOS distribution for histogram.
+    mode=raw (default) returns a seeded sample (seed=0 by default) of up to
+    50,000 LOS values, so the body is the same whenever its ETag is;
+    mode=histogram returns binned counts (see los_histogram_bins()).
+    """
+    if request.args.get('mode') == 'histogram':
+        return los_histogram_bins(request.args)
+    
+    rng = np.random.default_rng(number_param(request.args, 'seed', 0, cast=int, minimum=0))
+    df_filtered = apply_filters(['Length of Stay'])
+    los_data = df_filtered['Length of Stay'].to_numpy()
     # Sample if too large
-    if len(los_data) > 50000:
-        los_data = np.random.choice(los_data, 50000, replace=False).tolist()
-    return jsonify({'los': los_data})
+    if len(los_data) > LOS_SAMPLE_SIZE:
+        los_data = rng.choice(los_data, LOS_SAMPLE_SIZE, replace=False)
+    return {'los': array_payload(los_data)}
 
 @app.route('/api/data/severity')
+@cached_panel('severity')
 def get_severity_data():
     """Get severity analysis"""
-    df_filtered = apply_filters()
+    severity_stats = grouped_los_stats(['severity'])
     
-    if 'APR Severity of Illness Code' not in df_filtered.columns:
-        return jsonify({'error': 'Severity data not available'})
+    if severity_stats is None:
+        return {'error': 'Severity data not available'}
     
-    severity_stats = df_filtered.groupby('APR Severity of Illness Code')['Length of Stay'].agg(['median', 'mean', 'count']).reset_index()
     severity_stats.columns = ['severity', 'median_los', 'mean_los', 'count']
     
-    return jsonify({'data': severity_stats.to_dict('records')})
+    return {'data': table_payload(severity_stats)}
 
 @app.route('/api/data/severity-senior')
+@cached_panel('severity-senior')
 def get_severity_senior():
     """Get severity × senior interaction"""
-    df_filtered = apply_filters()
+    interaction = grouped_los_stats(['severity', 'is_senior'])
     
-    if 'APR Severity of Illness Code' not in df_filtered.columns or 'Is_Senior' not in df_filtered.columns:
-        return jsonify({'error': 'Data not available'})
+    if interaction is None:
+        return {'error': 'Data not available'}
     
-    interaction = df_filtered.groupby(['APR Severity of Illness Code', 'Is_Senior'])['Length of Stay'].median().reset_index()
+    interaction = interaction[['severity', 'is_senior', 'median']]
     interaction.columns = ['severity', 'is_senior', 'median_los']
     
-    return jsonify({'data': interaction.to_dict('records')})
+    return {'data': table_payload(interaction)}
 
 @app.route('/api/data/demographics')
+@cached_panel('demographics')
 def get_demographics():
     """Get demographic analysis"""
-    df_filtered = apply_filters()
     result = {}
     
     # Age groups
-    if 'Age_Numeric' in df_filtered.columns:
-        age_bins = [0, 30, 50, 70, 100]
-        age_labels = ['18-29', '30-49', '50-69', '70+']
-        df_filtered['Age_Group'] = pd.cut(df_filtered['Age_Numeric'], bins=age_bins, labels=age_labels, right=False)
-        age_stats = df_filtered.groupby('Age_Group')['Length of Stay'].agg(['median', 'mean', 'count']).reset_index()
+    age_stats = grouped_los_stats(['age_group'])
+    if age_stats is not None:
         age_stats.columns = ['age_group', 'median_los', 'mean_los', 'count']
-        result['age'] = age_stats.to_dict('records')
+        result['age'] = table_payload(age_stats)
     
     # Gender
-    if 'Gender' in df_filtered.columns:
-        gender_stats = df_filtered.groupby('Gender')['Length of Stay'].agg(['median', 'mean', 'count']).reset_index()
+    gender_stats = grouped_los_stats(['gender'])
+    if gender_stats is not None:
         gender_stats.columns = ['gender', 'median_los', 'mean_los', 'count']
-        result['gender'] = gender_stats.to_dict('records')
+        result['gender'] = table_payload(gender_stats)
     
-    return jsonify(result)
+    return result
 
 @app.route('/api/data/payment')
+@cached_panel('payment')
 def get_payment_data():
     """Get payment type analysis"""
-    df_filtered = apply_filters()
+    payment_stats = grouped_los_stats(['payment'])
     
-    if 'Payment_Type' not in df_filtered.columns:
-        return jsonify({'error': 'Payment data not available'})
+    if payment_stats is None:
+        return {'error': 'Payment data not available'}
     
-    payment_stats = df_filtered.groupby('Payment_Type')['Length of Stay'].agg(['median', 'mean', 'count']).reset_index()
     payment_stats.columns = ['payment_type', 'median_los', 'mean_los', 'count']
     payment_stats = payment_stats.sort_values('median_los', ascending=False).head(10)
     
-    return jsonify({'data': payment_stats.to_dict('records')})
+    return {'data': table_payload(payment_stats)}
 
 @app.route('/api/data/admission')
+@cached_panel('admission')
 def get_admission_data():
     """Get admission type analysis"""
-    df_filtered = apply_filters()
+    admission_stats = grouped_los_stats(['admission'])
     
-    if 'Type of Admission' not in df_filtered.columns:
-        return jsonify({'error': 'Admission data not available'})
+    if admission_stats is None:
+        return {'error': 'Admission data not available'}
     
-    admission_stats = df_filtered.groupby('Type of Admission')['Length of Stay'].agg(['median', 'mean', 'count']).reset_index()
     admission_stats.columns = ['admission_type', 'median_los', 'mean_los', 'count']
     
-    return jsonify({'data': admission_stats.to_dict('records')})
+    return {'data': table_payload(admission_stats)}
 
 @app.route('/api/data/disposition')
+@cached_panel('disposition')
 def get_disposition_data():
     """Get disposition analysis"""
-    df_filtered = apply_filters()
     result = {}
     
-    if 'Needs_Skilled_Nursing' in df_filtered.columns:
-        snf_stats = df_filtered.groupby('Needs_Skilled_Nursing')['Length of Stay'].agg(['median', 'mean', 'count']).reset_index()
+    snf_stats = grouped_los_stats(['needs_snf'])
+    if snf_stats is not None:
         snf_stats.columns = ['needs_snf', 'median_los', 'mean_los', 'count']
-        result['snf'] = snf_stats.to_dict('records')
+        result['snf'] = table_payload(snf_stats)
     
-    return jsonify(result)
+    return result
 
 @app.route('/api/data/top-drgs')
+@cached_panel('top-drgs')
 def get_top_drgs():
     """Get top DRG codes"""
-    df_filtered = apply_filters()
+    top_drgs = grouped_los_stats(['drg'])
     
-    if 'APR DRG Code' not in df_filtered.columns:
-        return jsonify({'error': 'DRG data not available'})
+    if top_drgs is None:
+        return {'error': 'DRG data not available'}
     
-    top_drgs = df_filtered.groupby('APR DRG Code').agg({
-        'Length of Stay': ['median', 'mean', 'count']
-    }).reset_index()
     top_drgs.columns = ['drg_code', 'median_los', 'mean_los', 'count']
     top_drgs = top_drgs.sort_values('count', ascending=False).head(20)
     
-    return jsonify({'data': top_drgs.to_dict('records')})
+    return {'data': table_payload(top_drgs)}
+
+# DRGs profiled by /api/data/drg-drilldown when none are requested
+DRILLDOWN_DEFAULT_DRGS = 10
+
+def drilldown_pool():
+    """This process's drill-down thread pool (pools do not survive a fork)"""
+    global _drilldown_pool
+    if _drilldown_pool is None or _drilldown_pool[0] != os.getpid():
+        _drilldown_pool = (os.getpid(), ThreadPoolExecutor(DRILLDOWN_WORKERS, thread_name_prefix='losight-drg'))
+    return _drilldown_pool[1]
+
+def drg_profile_counts(state, drg, filters, mix_names):
+    """
+    Row count, LOS histogram (distinct values and counts) and value counts
+    per mix_names filter for the rows of one DRG that match filters. Uses no
+    request context, so it can run on the drill-down pool.
+    """
+    index = state.filter_index
+    rows = index.select({**filters, 'drg': drg})
+    # A DRG's rows are contiguous unless rows were appended (see sort_by_drg())
+    part = as_slice(rows)
+    if part is None:
+        part = rows
+    los = index.los[part]
+    if los.dtype.kind in 'iu' and len(los) and los.min() >= 0:
+        # Whole days: count per value without sorting
+        los_counts = np.bincount(los)
+        los_values = np.flatnonzero(los_counts)
+        los_counts = los_counts[los_values]
+    else:
+        los_values, los_counts = np.unique(los, return_counts=True)
+    mixes = {}
+    for name in mix_names:
+        values = index.columns[name]
+        counts = np.bincount(values.codes[part] + 1, minlength=len(values.uniques) + 1)[1:]
+        mixes[name] = (values.uniques, counts)
+    return len(rows), los_values, los_counts, mixes
+
+def mix_table(name, uniques, counts, total):
+    """
+    Rows and share of the DRG's rows per value of a filter dimension, largest
+    first, shaped like table_payload() (built from arrays: a frame per DRG
+    would cost more than computing the mix)
+    """
+    present = np.flatnonzero(counts)
+    present = present[np.argsort(-counts[present], kind='stable')]
+    columns = {
+        name: uniques.take(present),
+        'count': counts[present].astype(np.int64),
+        'share': counts[present] / total if total else np.zeros(0),
+    }
+    if request.args.get('format') != 'columnar':
+        return [dict(zip(columns, row)) for row in zip(*(values.tolist() for values in columns.values()))]
+    return {
+        col: array_payload(np.asarray(values)) if pd.api.types.is_numeric_dtype(values) else values.tolist()
+        for col, values in columns.items()
+    }
+
+@app.route('/api/data/drg-drilldown')
+@cached_panel('drg-drilldown', params=('drgs', 'bins', 'bin_width', 'edges', 'log', 'max_los'))
+def get_drg_drilldown():
+    """
+    Per-DRG profiles for drgs=194,720,... (default: the drg filter, or the
+    10 largest DRGs): LOS statistics and histogram (binned as for
+    los-distribution with mode=histogram), severity mix and payer mix. The
+    other filters apply within each DRG. DRGs are computed in parallel, each
+    from its own contiguous rows.
+    """
+    state = current_state()
+    drg_counts = state.filter_index.value_counts('drg')
+    if drg_counts is None or state.filter_index.los is None:
+        return {'error': 'DRG data not available'}
+    filters = get_filters()
+    if request.args.get('drgs'):
+        drgs = parse_drgs(request.args['drgs'], 'drgs')
+    elif filters['drg'] is not None:
+        drgs = filters['drg']
+    else:
+        drgs = drg_counts.sort_values(ascending=False, kind='stable').head(DRILLDOWN_DEFAULT_DRGS).index.tolist()
+    drgs = [int(d) for d in (drgs if isinstance(drgs, (tuple, list)) else (drgs,))]
+    mix_names = [name for name in ('severity', 'payment') if name in state.filter_index.columns]
+    
+    with request_phase('aggregate'):
+        if len(drgs) > 1:
+            results = list(drilldown_pool().map(
+                lambda drg: drg_profile_counts(state, drg, filters, mix_names), drgs))
+        else:
+            results = [drg_profile_counts(state, drg, filters, mix_names) for drg in drgs]
+    count_rows_scanned(sum(result[0] for result in results))
+    
+    profiles = []
+    for drg, (n, los_values, los_counts, mixes) in zip(drgs, results):
+        summary = histogram_summary(los_values, los_counts, (0.25, 0.5, 0.75, 0.9))
+        q25, median, q75, q90 = summary['quantiles']
+        profile = {
+            'drg_code': drg,
+            'count': n,
+            'mean_los': summary['mean'],
+            'median_los': median,
+            'std_los': summary['std'],
+            'q25': q25,
+            'q75': q75,
+            'q90': q90,
+            'min_los': summary['min'],
+            'max_los': summary['max'],
+            'distribution': los_histogram_bins(request.args, los_values, los_counts),
+        }
+        if 'severity' in mixes:
+            profile['severity_mix'] = mix_table('severity', *mixes['severity'], n)
+        if 'payment' in mixes:
+            profile['payer_mix'] = mix_table('payment', *mixes['payment'], n)
+        profiles.append(profile)
+    
+    return {'drgs': profiles, 'total': sum(p['count'] for p in profiles)}
 
 @app.route('/api/data/outliers')
+@cached_panel('outliers', params=('exact', 'format', 'seed'))
 def get_outliers():
-    """Get outlier analysis"""
-    df_filtered = apply_filters()
+    """
+    Get outlier analysis.
+    Plot points are a seeded stratified sample (seed=0 by default) in which
+    extreme and mild outliers are always represented; format=columnar returns
+    each point class as parallel index/los arrays instead of records.
+    exact=true computes the IQR bounds from the filtered rows.
+    """
+    los = filtered_los()
     
-    Q1 = df_filtered['Length of Stay'].quantile(0.25)
-    Q3 = df_filtered['Length of Stay'].quantile(0.75)
+    if exact_requested():
+        Q1, Q3 = pd.Series(los).quantile([0.25, 0.75]).tolist()
+    else:
+        values, counts = los_value_counts()
+        Q1, Q3 = histogram_summary(values, counts, (0.25, 0.75))['quantiles']
     IQR = Q3 - Q1
     upper_bound = Q3 + 1.5 * IQR
     extreme_upper = Q3 + 3 * IQR
     
-    mild_outliers = len(df_filtered[df_filtered['Length of Stay'] > upper_bound])
-    extreme_outliers = len(df_filtered[df_filtered['Length of Stay'] > extreme_upper])
+    is_mild = los > upper_bound
+    is_extreme = los > extreme_upper
+    mild_outliers = int(np.count_nonzero(is_mild))
+    extreme_outliers = int(np.count_nonzero(is_extreme))
     
-    # Get outlier data points for scatter plot (sample if too many for performance)
-    # Create a combined dataset with all points, then sample
-    df_plot = df_filtered[['Length of Stay']].copy()
-    df_plot['index'] = range(len(df_plot))
-    
-    # Sample if too large (max 5000 points for smooth rendering)
-    max_points = 5000
-    if len(df_plot) > max_points:
-        df_plot = df_plot.sample(n=max_points).sort_values('index')
-        df_plot['index'] = range(len(df_plot))
+    # Sample positions per class (max 5000 points for smooth rendering);
+    # points are indexed by their order in the filtered rows
+    strata = [
+        np.flatnonzero(is_extreme),
+        np.flatnonzero(is_mild & ~is_extreme),
+        np.flatnonzero(~is_mild),
+    ]
+    rng = np.random.default_rng(number_param(request.args, 'seed', 0, cast=int, minimum=0))
+    sampled = stratified_sample(strata, OUTLIER_MAX_POINTS, OUTLIER_MIN_SHARE, rng)
+    order = np.concatenate(sampled)
+    index = np.empty(len(order), dtype=np.int64)
+    index[np.argsort(order, kind='stable')] = np.arange(len(order))
     
-    # Separate into categories
-    normal_points = df_plot[df_plot['Length of Stay'] <= upper_bound][['index', 'Length of Stay']].to_dict('records')
-    mild_outlier_points = df_plot[(df_plot['Length of Stay'] > upper_bound) & (df_plot['Length of Stay'] <= extreme_upper)][['index', 'Length of Stay']].to_dict('records')
-    extreme_outlier_points = df_plot[df_plot['Length of Stay'] > extreme_upper][['index', 'Length of Stay']].to_dict('records')
+    points = []
+    start = 0
+    for positions in sampled:
+        stop = start + len(positions)
+        points.append(point_arrays(index[start:stop], los[positions]))
+        start = stop
+    extreme_outlier_points, mild_outlier_points, normal_points = points
     
-    return jsonify({
+    return {
         'mild_outliers': mild_outliers,
         'extreme_outliers': extreme_outliers,
         'upper_bound': float(upper_bound),
@@ -413,16 +1402,250 @@ def get_outliers():
         'mild_outlier_points': mild_outlier_points,
         'extreme_outlier_points': extreme_outlier_points,
         'normal_points': normal_points
-    })
+    }
+
+@app.route('/api/data/batch')
+def get_batch():
+    """
+    Several panels for one filter set in a single response, keyed by panel name.
+    panels=overview,severity,... selects the panels (default: every /api/data
+    panel); filters and panel parameters are passed as for the single endpoints.
+    The filtered row selection is resolved once and shared by all panels.
+    """
+    # A panel named twice is computed and returned once, in first-named order
+    names = list(dict.fromkeys(p for p in request.args.get('panels', '').split(',') if p))
+    if not names:
+        names = [p for p in PANELS if p != 'filter-options']
+    unknown = [p for p in names if p not in PANELS]
+    if unknown:
+        return jsonify({'error': f"Unknown panels: {', '.join(unknown)}"}), 400
+
+    def compute():
+        parts = [json.dumps(p).encode('utf-8') + b':' + panel_body(p)[0] for p in names]
+        return b'{' + b','.join(parts) + b'}', None
+    
+    load_data()
+    return send_cached_json(('batch',) + tuple(panel_key(p) for p in names), compute)
+
+# /api/predict fields -> dataset columns they provide
+PREDICT_FIELDS = {
+    'severity': 'APR Severity of Illness Code',
+    'risk_of_mortality': 'APR Risk of Mortality',
+    'age_group': 'Age Group',
+    'age': 'Age_Numeric',
+    'payment': 'Payment_Type',
+    'admission': 'Type of Admission',
+    'drg': 'APR DRG Code',
+}
+NUMERIC_PREDICT_FIELDS = ('severity', 'age', 'drg')
+# Text fields the model reads through a parser (NaN: not understood)
+PREDICT_TEXT_PARSERS = {
+    'age_group': extract_age,
+    'risk_of_mortality': lambda v: MORTALITY_ORDINAL.get(v, np.nan),
+}
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def predict_values(field, values):
+    """
+    The values of /api/predict field as the model reads them. Missing values
+    (absent or null) are left for the model to impute; present values that
+    do not parse raise InvalidParameter.
+    """
+    def invalid(value):
+        return InvalidParameter(f"Invalid {field}: {value!r}")
+    
+    if field in NUMERIC_PREDICT_FIELDS:
+        if values.dtype.kind in 'iuf':
+            numbers = values.to_numpy(dtype=np.float64)
+            bad = np.isinf(numbers)
+            if bad.any():
+                raise invalid(numbers[bad][0])
+            return numbers
+        numbers = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            if _is_missing(value):
+                continue
+            if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, str, np.number)):
+                raise invalid(value)
+            try:
+                numbers[i] = float(value)
+            except ValueError:
+                raise invalid(value) from None
+            if not math.isfinite(numbers[i]):
+                raise invalid(value)
+        return numbers
+    
+    parse = PREDICT_TEXT_PARSERS.get(field)
+    texts = np.full(len(values), np.nan, dtype=object)
+    for i, value in enumerate(values):
+        if _is_missing(value):
+            continue
+        if not isinstance(value, str) or (parse is not None and pd.isna(parse(value))):
+            raise invalid(value)
+        texts[i] = value
+    return texts
+
+# Flags create_row_features() derives from the /api/predict input columns, and
+# the interaction features built from them
+PREDICT_FLAG_SOURCES = {
+    'Age_Numeric': ('Is_Senior',),
+    'Payment_Type': tuple(TEXT_FLAGS['Payment_Type']),
+    'Type of Admission': tuple(TEXT_FLAGS['Type of Admission']) + ('Is_Elective',),
+}
+INTERACTION_FEATURES = ('Severity_x_Senior', 'Severity_x_Risk', 'Severity_x_Medicaid')
+
+def predict_features(frame):
+    """
+    Row features of /api/predict input. Flags derived from a missing value
+    are missing as well (in the dataset they would be 0), so the model imputes
+    them as it does when the field is absent.
+    """
+    create_row_features(frame)
+    for source, flags in PREDICT_FLAG_SOURCES.items():
+        if source in frame.columns:
+            missing = frame[source].isna().to_numpy()
+            for flag in flags:
+                if flag in frame.columns:
+                    frame[flag] = np.where(missing, np.nan, frame[flag])
+    # Interactions again, from the masked flags
+    frame.drop(columns=list(INTERACTION_FEATURES), errors='ignore', inplace=True)
+    create_row_features(frame)
+
+@app.route('/api/predict', methods=['GET', 'POST'])
+def predict():
+    """
+    Predicted LOS with an 80% interval.
+    POST a single patient as a JSON object, or many as {"patients": [...]}
+    (a list of objects, or an object of equal-length lists). Fields are those
+    of PREDICT_FIELDS; missing ones, and DRG codes the model has not seen,
+    are imputed, and values that do not parse get a 400. Batch results are
+    parallel arrays in request order. GET describes the model.
+    """
+    los_model = current_state().model
+    if los_model is None:
+        return jsonify({'error': 'Prediction model not available'}), 503
+    if request.method == 'GET':
+        return jsonify(los_model.describe())
+    
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    batch = 'patients' in payload
+    try:
+        frame = pd.DataFrame(payload['patients'] if batch else [payload])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid patients: {e}'}), 400
+    unknown = [c for c in frame.columns if c not in PREDICT_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(map(str, unknown))}"}), 400
+    
+    for field in frame.columns:
+        frame[field] = predict_values(field, frame[field])
+    frame = frame.rename(columns=PREDICT_FIELDS)
+    predict_features(frame)
+    result = los_model.predict(frame)
+    
+    body = {'interval_quantiles': list(prediction.INTERVAL_QUANTILES)}
+    for key, values in result.items():
+        body[key] = values.round(2).tolist() if batch else round(float(values[0]), 2)
+    if batch:
+        body['count'] = len(frame)
+    return jsonify(body)
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Request, phase, startup and cache metrics in the Prometheus text format"""
+    stats = result_cache.stats()
+    metrics.RESULT_CACHE_BYTES.set((), stats['size_bytes'])
+    metrics.RESULT_CACHE_ENTRIES.set((), stats['entries'])
+    metrics.RESULT_CACHE_LOOKUPS.set(('hit',), stats['hits'])
+    metrics.RESULT_CACHE_LOOKUPS.set(('miss',), stats['misses'])
+    return app.response_class(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Result cache counters and memory use"""
+    return jsonify(result_cache.stats())
+
+@app.route('/api/ready')
+def ready():
+    """
+    Readiness probe: 503 until the dataset is loaded (never loads it itself)
+    and, with warm=true, until its cache warm-up has ended. Reports warm-up progress.
+    """
+    state = dataset_state
+    progress = warmup_scheduler.progress()
+    is_ready = state is not None
+    if request.args.get('warm') == 'true' and progress is not None:
+        is_ready = is_ready and progress['label'] == state.version and progress['state'] != 'running'
+    return jsonify({
+        'ready': is_ready,
+        'dataset_version': state.version if state is not None else None,
+        'warmup': progress,
+    }), 200 if is_ready else 503
+
+def admin_required(view):
+    """Require the LOSIGHT_ADMIN_TOKEN bearer token (admin endpoints are off without one)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': 'Admin endpoints are disabled; set LOSIGHT_ADMIN_TOKEN'}), 403
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({'error': 'Invalid admin token'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/reload', methods=['POST'])
+@admin_required
+def admin_reload():
+    """Rebuild the dataset from its CSV in the background and swap it in when ready"""
+    job = reloader.submit('reload', reload_dataset, reason='admin')
+    return jsonify({'job': job}), 202
+
+@app.route('/api/admin/append', methods=['POST'])
+@admin_required
+def admin_append():
+    """
+    Append the rows of a delta CSV on the server ({"path": ...}) in the
+    background. The delta must have the columns of the loaded dataset.
+    """
+    payload = request.get_json(silent=True) or {}
+    path = payload.get('path')
+    if not isinstance(path, str) or not os.path.isfile(path):
+        return jsonify({'error': 'Expected {"path": ...} naming a CSV file on the server'}), 400
+    job = reloader.submit('append', lambda: append_dataset(path), path=os.path.abspath(path))
+    return jsonify({'job': job}), 202
+
+@app.route('/api/admin/status')
+@admin_required
+def admin_status():
+    """The dataset version being served and the recent reload/append jobs"""
+    return jsonify({'dataset': load_state().describe(), 'jobs': reloader.jobs()})
 
 @app.route('/api/filters/options')
+@cached_panel('filter-options')
 def get_filter_options():
     """Get available filter options"""
-    df_full = load_data()
+    return filter_options(current_state())
+
+def filter_options(state):
+    """
+    Values offered by each dashboard filter. Filter values and DRG volumes
+    come from the filter index's row counts instead of scanning the rows.
+    """
+    df_full = state.df
     options = {}
     
-    if 'APR Severity of Illness Code' in df_full.columns:
-        options['severity'] = sorted(df_full['APR Severity of Illness Code'].dropna().unique().tolist())
+    def present(name):
+        counts = state.filter_index.value_counts(name)
+        return None if counts is None else counts[counts > 0]
+    
+    severity = present('severity')
+    if severity is not None:
+        options['severity'] = sorted(severity.index.tolist())
     
     if 'Age_Numeric' in df_full.columns:
         options['age'] = {
@@ -430,14 +1653,15 @@ def get_filter_options():
             'max': int(df_full['Age_Numeric'].max())
         }
     
-    if 'Payment_Type' in df_full.columns:
-        options['payment'] = sorted(df_full['Payment_Type'].dropna().unique().tolist())
-    
-    if 'Type of Admission' in df_full.columns:
-        options['admission'] = sorted(df_full['Type of Admission'].dropna().unique().tolist())
+    for name in ('payment', 'admission'):
+        counts = present(name)
+        if counts is not None:
+            options[name] = sorted(counts.index.tolist())
     
-    if 'APR DRG Code' in df_full.columns:
-        top_drgs = df_full['APR DRG Code'].value_counts().head(50).index.tolist()
+    drg_counts = present('drg')
+    if drg_counts is not None:
+        # Most frequent first; ties in DRG code order
+        top_drgs = drg_counts.sort_values(ascending=False, kind='stable').head(50).index.tolist()
         options['drg'] = sorted([int(d) for d in top_drgs])
     
     if 'Length of Stay' in df_full.columns:
@@ -446,7 +1670,7 @@ def get_filter_options():
             'max': int(min(df_full['Length of Stay'].max(), 50))
         }
     
-    return jsonify(options)
+    return options
 
 if __name__ == '__main__':
     print("=" * 60)
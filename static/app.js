@@ -339,59 +339,100 @@ function buildQueryString() {
     return params.toString();
 }
 
+// Panels shown on each tab (names of the /api/data/* endpoints)
+const TAB_PANELS = {
+    overview: ['overview', 'los-distribution'],
+    severity: ['severity', 'severity-senior'],
+    demographics: ['demographics'],
+    payment: ['payment', 'admission', 'disposition'],
+    trends: ['top-drgs'],
+    outliers: ['outliers']
+};
+
+// Extra parameters sent along with the filters
+const PANEL_PARAMS = 'mode=histogram&max_los=50&bins=40&format=columnar&binary=1';
+
+// Typed array constructors for binary=1 arrays ({dtype, base64})
+const TYPED_ARRAYS = {
+    int8: Int8Array, uint8: Uint8Array, int16: Int16Array, uint16: Uint16Array,
+    int32: Int32Array, uint32: Uint32Array, float32: Float32Array, float64: Float64Array
+};
+
+// Replace binary arrays in a response with plain arrays
+function decodeArrays(value) {
+    if (Array.isArray(value)) {
+        return value.map(decodeArrays);
+    }
+    if (value === null || typeof value !== 'object') {
+        return value;
+    }
+    if (typeof value.base64 === 'string' && TYPED_ARRAYS[value.dtype]) {
+        const raw = atob(value.base64);
+        const bytes = new Uint8Array(raw.length);
+        for (let i = 0; i < raw.length; i++) {
+            bytes[i] = raw.charCodeAt(i);
+        }
+        return Array.from(new TYPED_ARRAYS[value.dtype](bytes.buffer));
+    }
+    const decoded = {};
+    for (const [key, item] of Object.entries(value)) {
+        decoded[key] = decodeArrays(item);
+    }
+    return decoded;
+}
+
+// Fetch several panels for the current filters in one request
+async function fetchPanels(panels, timeout = 30000) {
+    const query = buildQueryString();
+    const url = `${API_BASE}/data/batch?panels=${panels.join(',')}&${PANEL_PARAMS}${query ? '&' + query : ''}`;
+    const response = await Promise.race([
+        fetch(url),
+        new Promise((_, reject) => 
+            setTimeout(() => reject(new Error('Request timeout')), timeout)
+        )
+    ]);
+    if (!response.ok) {
+        throw new Error(`Batch API error: ${response.status}`);
+    }
+    return decodeArrays(await response.json());
+}
+
 // Load initial data
 async function loadInitialData() {
     await loadOverviewData();
 }
 
-// Load all data
+// Load all data (one request for every panel)
 async function loadAllData() {
+    const batch = await fetchPanels(Object.values(TAB_PANELS).flat());
     await Promise.all([
-        loadOverviewData(),
-        loadSeverityData(),
-        loadDemographicsData(),
-        loadPaymentData(),
-        loadTrendsData(),
-        loadOutliersData()
+        loadOverviewData(batch),
+        loadSeverityData(batch),
+        loadDemographicsData(batch),
+        loadPaymentData(batch),
+        loadTrendsData(batch),
+        loadOutliersData(batch)
     ]);
 }
 
 // Load overview data
-async function loadOverviewData() {
+async function loadOverviewData(batch) {
     try {
-        const query = buildQueryString();
         console.log('Fetching overview data...');
         
-        // Add timeout to fetch requests
-        const fetchWithTimeout = (url, timeout = 30000) => {
-            return Promise.race([
-                fetch(url),
-                new Promise((_, reject) => 
-                    setTimeout(() => reject(new Error('Request timeout')), timeout)
-                )
-            ]);
-        };
-        
-        const [overview, losDist] = await Promise.all([
-            fetchWithTimeout(`${API_BASE}/data/overview?${query}`).then(r => {
-                if (!r.ok) throw new Error(`Overview API error: ${r.status}`);
-                return r.json();
-            }),
-            fetchWithTimeout(`${API_BASE}/data/los-distribution?${query}`).then(r => {
-                if (!r.ok) throw new Error(`LOS Distribution API error: ${r.status}`);
-                return r.json();
-            })
-        ]);
+        const data = batch || await fetchPanels(TAB_PANELS.overview);
+        const overview = data['overview'];
+        const losDist = data['los-distribution'];
         
         console.log('✓ Data fetched successfully');
         console.log('Overview data:', overview);
-        console.log('LOS data points:', losDist.los ? losDist.los.length : 'missing');
+        console.log('LOS histogram bins:', losDist.counts ? losDist.counts.length : 'missing');
         
         // Validate data
         if (!overview || !overview.total_patients) {
             throw new Error('Invalid overview data received');
         }
-        if (!losDist || !losDist.los || !Array.isArray(losDist.los)) {
+        if (!losDist || !Array.isArray(losDist.counts) || !Array.isArray(losDist.edges)) {
             throw new Error('Invalid LOS distribution data received');
         }
         
@@ -411,7 +452,7 @@ async function loadOverviewData() {
         
         
         // Charts
-        updateLOSHistogram(losDist.los, overview);
+        updateLOSHistogram(losDist, overview);
         updateLOSBoxPlot(overview);
         
         // Hide loading and error messages
@@ -425,31 +466,16 @@ async function loadOverviewData() {
     }
 }
 
-// Update LOS histogram
-function updateLOSHistogram(losData, stats) {
+// Update LOS histogram (bins are computed by the server)
+function updateLOSHistogram(histogram, stats) {
     const ctx = document.getElementById('los-histogram');
     if (charts.losHistogram) {
         charts.losHistogram.destroy();
     }
     
-    const maxLOS = Math.min(Math.max(...losData), 50);
-    const binSize = Math.ceil(maxLOS / 40);
-    const bins = [];
-    const counts = [];
-    
-    for (let i = 0; i <= maxLOS; i += binSize) {
-        bins.push(`${i}-${i + binSize}`);
-        counts.push(0);
-    }
-    
-    losData.forEach(los => {
-        if (los <= maxLOS) {
-            const binIndex = Math.floor(los / binSize);
-            if (binIndex < counts.length) {
-                counts[binIndex]++;
-            }
-        }
-    });
+    const edges = histogram.edges;
+    const counts = histogram.counts;
+    const bins = counts.map((_, i) => `${edges[i]}-${edges[i + 1]}`);
     
     charts.losHistogram = new Chart(ctx, {
         type: 'bar',
@@ -545,13 +571,11 @@ function updateLOSBoxPlot(stats) {
 }
 
 // Load severity data
-async function loadSeverityData() {
+async function loadSeverityData(batch) {
     try {
-        const query = buildQueryString();
-        const [severityData, severitySenior] = await Promise.all([
-            fetch(`${API_BASE}/data/severity?${query}`).then(r => r.json()),
-            fetch(`${API_BASE}/data/severity-senior?${query}`).then(r => r.json())
-        ]);
+        const data = batch || await fetchPanels(TAB_PANELS.severity);
+        const severityData = data['severity'];
+        const severitySenior = data['severity-senior'];
         
         if (severityData.data) {
             updateSeverityChart(severityData.data, 'median');
@@ -577,8 +601,8 @@ function updateSeverityChart(data, type) {
         charts[chartKey].destroy();
     }
     
-    const labels = data.map(d => `Severity ${d.severity}`);
-    const values = data.map(d => d[`${type}_los`]);
+    const labels = data.severity.map(s => `Severity ${s}`);
+    const values = data[`${type}_los`];
     
     charts[chartKey] = new Chart(ctx, {
         type: 'bar',
@@ -617,14 +641,14 @@ function updateSeveritySeniorChart(data) {
     
     // Group by severity
     const severityGroups = {};
-    data.forEach(d => {
-        if (!severityGroups[d.severity]) {
-            severityGroups[d.severity] = { senior: null, nonSenior: null };
+    data.severity.forEach((severity, i) => {
+        if (!severityGroups[severity]) {
+            severityGroups[severity] = { senior: null, nonSenior: null };
         }
-        if (d.is_senior === 1) {
-            severityGroups[d.severity].senior = d.median_los;
+        if (data.is_senior[i] === 1) {
+            severityGroups[severity].senior = data.median_los[i];
         } else {
-            severityGroups[d.severity].nonSenior = d.median_los;
+            severityGroups[severity].nonSenior = data.median_los[i];
         }
     });
     
@@ -667,11 +691,9 @@ function updateSeveritySeniorChart(data) {
 }
 
 // Load demographics data
-async function loadDemographicsData() {
+async function loadDemographicsData(batch) {
     try {
-        const query = buildQueryString();
-        const response = await fetch(`${API_BASE}/data/demographics?${query}`);
-        const data = await response.json();
+        const data = (batch || await fetchPanels(TAB_PANELS.demographics))['demographics'];
         
         if (data.age) {
             updateAgeChart(data.age);
@@ -693,8 +715,8 @@ function updateAgeChart(data) {
         charts.ageChart.destroy();
     }
     
-    const labels = data.map(d => d.age_group);
-    const medians = data.map(d => d.median_los);
+    const labels = data.age_group;
+    const medians = data.median_los;
     
     charts.ageChart = new Chart(ctx, {
         type: 'bar',
@@ -731,8 +753,8 @@ function updateGenderChart(data) {
         charts.genderChart.destroy();
     }
     
-    const labels = data.map(d => d.gender);
-    const medians = data.map(d => d.median_los);
+    const labels = data.gender;
+    const medians = data.median_los;
     
     charts.genderChart = new Chart(ctx, {
         type: 'bar',
@@ -763,14 +785,12 @@ function updateGenderChart(data) {
 }
 
 // Load payment data
-async function loadPaymentData() {
+async function loadPaymentData(batch) {
     try {
-        const query = buildQueryString();
-        const [paymentData, admissionData, dispositionData] = await Promise.all([
-            fetch(`${API_BASE}/data/payment?${query}`).then(r => r.json()),
-            fetch(`${API_BASE}/data/admission?${query}`).then(r => r.json()),
-            fetch(`${API_BASE}/data/disposition?${query}`).then(r => r.json())
-        ]);
+        const data = batch || await fetchPanels(TAB_PANELS.payment);
+        const paymentData = data['payment'];
+        const admissionData = data['admission'];
+        const dispositionData = data['disposition'];
         
         if (paymentData.data) {
             updatePaymentChart(paymentData.data);
@@ -796,8 +816,8 @@ function updatePaymentChart(data) {
         charts.paymentChart.destroy();
     }
     
-    const labels = data.map(d => d.payment_type);
-    const medians = data.map(d => d.median_los);
+    const labels = data.payment_type;
+    const medians = data.median_los;
     
     charts.paymentChart = new Chart(ctx, {
         type: 'bar',
@@ -835,8 +855,8 @@ function updateAdmissionChart(data) {
         charts.admissionChart.destroy();
     }
     
-    const labels = data.map(d => d.admission_type);
-    const medians = data.map(d => d.median_los);
+    const labels = data.admission_type;
+    const medians = data.median_los;
     
     charts.admissionChart = new Chart(ctx, {
         type: 'bar',
@@ -874,8 +894,8 @@ function updateSNFChart(data) {
         charts.snfChart.destroy();
     }
     
-    const labels = data.map(d => d.needs_snf === 1 ? 'Needs SNF' : 'No SNF');
-    const medians = data.map(d => d.median_los);
+    const labels = data.needs_snf.map(v => v === 1 ? 'Needs SNF' : 'No SNF');
+    const medians = data.median_los;
     
     charts.snfChart = new Chart(ctx, {
         type: 'bar',
@@ -906,11 +926,9 @@ function updateSNFChart(data) {
 }
 
 // Load trends data
-async function loadTrendsData() {
+async function loadTrendsData(batch) {
     try {
-        const query = buildQueryString();
-        const response = await fetch(`${API_BASE}/data/top-drgs?${query}`);
-        const data = await response.json();
+        const data = (batch || await fetchPanels(TAB_PANELS.trends))['top-drgs'];
         
         if (data.data) {
             updateDRGChart(data.data);
@@ -928,8 +946,8 @@ function updateDRGChart(data) {
         charts.drgChart.destroy();
     }
     
-    const labels = data.map(d => `DRG ${d.drg_code}`);
-    const counts = data.map(d => d.count);
+    const labels = data.drg_code.map(code => `DRG ${code}`);
+    const counts = data.count;
     
     charts.drgChart = new Chart(ctx, {
         type: 'bar',
@@ -961,11 +979,9 @@ function updateDRGChart(data) {
 }
 
 // Load outliers data
-async function loadOutliersData() {
+async function loadOutliersData(batch) {
     try {
-        const query = buildQueryString();
-        const response = await fetch(`${API_BASE}/data/outliers?${query}`);
-        const data = await response.json();
+        const data = (batch || await fetchPanels(TAB_PANELS.outliers))['outliers'];
         
         document.getElementById('outlier-mild').textContent = data.mild_outliers.toLocaleString();
         document.getElementById('outlier-extreme').textContent = data.extreme_outliers.toLocaleString();
@@ -993,15 +1009,16 @@ function updateOutlierScatterPlot(data) {
     // Clear canvas
     ctx.clearRect(0, 0, canvas.width, canvas.height);
     
-    // Prepare data
-    const normalPoints = data.normal_points || [];
-    const mildOutlierPoints = data.mild_outlier_points || [];
-    const extremeOutlierPoints = data.extreme_outlier_points || [];
+    // Prepare data (points arrive as parallel arrays: {index: [...], los: [...]})
+    const toPoints = (columns) => columns ? columns.index.map((index, i) => ({ index, los: columns.los[i] })) : [];
+    const normalPoints = toPoints(data.normal_points);
+    const mildOutlierPoints = toPoints(data.mild_outlier_points);
+    const extremeOutlierPoints = toPoints(data.extreme_outlier_points);
     
     // Find min/max for scaling
     const allPoints = [...normalPoints, ...mildOutlierPoints, ...extremeOutlierPoints];
     const maxIndex = Math.max(...allPoints.map(p => p.index), 1);
-    const maxLOS = Math.max(...allPoints.map(p => p['Length of Stay']), data.upper_bound || 1);
+    const maxLOS = Math.max(...allPoints.map(p => p.los), data.upper_bound || 1);
     
     // Padding
     const padding = { top: 40, right: 40, bottom: 60, left: 60 };
@@ -1032,21 +1049,21 @@ function updateOutlierScatterPlot(data) {
     ctx.fillStyle = '#4caf50';
     normalPoints.forEach(point => {
         ctx.beginPath();
-        ctx.arc(scaleX(point.index), scaleY(point['Length of Stay']), 2, 0, 2 * Math.PI);
+        ctx.arc(scaleX(point.index), scaleY(point.los), 2, 0, 2 * Math.PI);
         ctx.fill();
     });
     
     ctx.fillStyle = '#ff9800';
     mildOutlierPoints.forEach(point => {
         ctx.beginPath();
-        ctx.arc(scaleX(point.index), scaleY(point['Length of Stay']), 3, 0, 2 * Math.PI);
+        ctx.arc(scaleX(point.index), scaleY(point.los), 3, 0, 2 * Math.PI);
         ctx.fill();
     });
     
     ctx.fillStyle = '#f44336';
     extremeOutlierPoints.forEach(point => {
         ctx.beginPath();
-        ctx.arc(scaleX(point.index), scaleY(point['Length of Stay']), 4, 0, 2 * Math.PI);
+        ctx.arc(scaleX(point.index), scaleY(point.los), 4, 0, 2 * Math.PI);
         ctx.fill();
     });
     
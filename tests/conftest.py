@@ -0,0 +1,34 @@
+"""
+Shared fixtures: the server loaded with a small synthetic dataset (see
+benchmarks/generate_data.py), without dataset cache, warm-up or request log.
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def losight(tmp_path_factory):
+    """The server module with its dataset loaded"""
+    from generate_data import generate
+    csv_path = str(tmp_path_factory.mktemp('data') / 'hospital_data.csv')
+    generate(csv_path, 5000, seed=1, log=lambda message: None)
+    # Small chunks, so that ingestion merges several of them
+    os.environ.update(LOSIGHT_CSV_PATH=csv_path, LOSIGHT_CACHE_DIR='', LOSIGHT_WARMUP_SECONDS='0',
+                      LOSIGHT_REQUEST_LOG='', LOSIGHT_CSV_CHUNK_ROWS='2000')
+    import server
+    server.load_data()
+    return server
+
+
+@pytest.fixture
+def client(losight):
+    # Results cached by earlier tests would hide the code under test
+    losight.result_cache.clear()
+    return losight.app.test_client()
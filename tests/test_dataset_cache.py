@@ -0,0 +1,79 @@
+"""The dataset cache hashes the source CSV only when its mtime has changed"""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import dataset_cache
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    """Paths passed to file_sha256, in order"""
+    calls = []
+    file_sha256 = dataset_cache.file_sha256
+
+    def counting_sha256(path):
+        calls.append(path)
+        return file_sha256(path)
+
+    monkeypatch.setattr(dataset_cache, 'file_sha256', counting_sha256)
+    return calls
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'hospital_data.csv'
+    path.write_text('Length of Stay,Gender\n3,F\n5,M\n')
+    return str(path)
+
+
+def touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def manifest(cache_dir):
+    with open(os.path.join(cache_dir, 'hospital_data', dataset_cache.MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def frame():
+    return pd.DataFrame({'Length of Stay': [3, 5], 'Gender': pd.Categorical(['F', 'M'])})
+
+
+def test_touched_source_is_hashed_once(source, tmp_path, hashes):
+    cache_dir = str(tmp_path / 'cache')
+    dataset_cache.save_cached_frame(frame(), source, cache_dir)
+    assert len(hashes) == 1
+    touch(source)
+    assert dataset_cache.load_cached_frame(source, cache_dir, mmap=False) is not None
+    assert len(hashes) == 2
+    assert manifest(cache_dir)['source']['mtime_ns'] == os.stat(source).st_mtime_ns
+    # The next boot trusts size and mtime again
+    assert dataset_cache.load_cached_frame(source, cache_dir, mmap=False) is not None
+    assert len(hashes) == 2
+
+
+def test_changed_source_is_not_fresh(source, tmp_path, hashes):
+    cache_dir = str(tmp_path / 'cache')
+    dataset_cache.save_cached_frame(frame(), source, cache_dir)
+    with open(source, 'r+') as f:
+        f.seek(len('Length of Stay,Gender\n'))
+        f.write('4')
+    touch(source)
+    assert dataset_cache.load_cached_frame(source, cache_dir, mmap=False) is None
+    assert manifest(cache_dir)['source']['mtime_ns'] != os.stat(source).st_mtime_ns
+
+
+def test_saving_again_reuses_the_source_hash(source, tmp_path, hashes):
+    cache_dir = str(tmp_path / 'cache')
+    dataset_cache.save_cached_frame(frame(), source, cache_dir)
+    dataset_cache.save_cached_frame(frame(), source, cache_dir, metadata={'deltas': [1]})
+    assert len(hashes) == 1
+    assert manifest(cache_dir)['metadata'] == {'deltas': [1]}
+    touch(source)
+    dataset_cache.save_cached_frame(frame(), source, cache_dir)
+    assert len(hashes) == 2
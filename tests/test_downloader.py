@@ -0,0 +1,141 @@
+"""Interrupted and resumed downloads against a local http.server"""
+
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import downloader
+from downloader import DownloadError, download_file
+
+SEGMENT_SIZE = 64 * 1024
+
+
+class Site:
+    """The file served, and what the handler saw"""
+
+    def __init__(self, data, etag):
+        self.data = data
+        self.etag = etag
+        self.cut_after = None  # close the next long response after this many bytes
+        self.requests = []  # (Range header, status)
+        self.lock = threading.Lock()
+
+    def serve(self, range_header, if_range):
+        """Status, headers and body for a GET"""
+        data = self.data
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header or '')
+        if not match or (if_range and if_range != self.etag):
+            return 200, {'Content-Length': len(data)}, data
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+        if start >= len(data):
+            return 416, {'Content-Range': f'bytes */{len(data)}', 'Content-Length': 0}, b''
+        return 206, {'Content-Range': f'bytes {start}-{end}/{len(data)}',
+                     'Content-Length': end - start + 1}, data[start:end + 1]
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        site = self.server.site
+        range_header = self.headers.get('Range')
+        with site.lock:
+            status, headers, body = site.serve(range_header, self.headers.get('If-Range'))
+            site.requests.append((range_header, status))
+            cut, site.cut_after = (site.cut_after, None) if site.cut_after is not None and len(body) > site.cut_after \
+                else (None, site.cut_after)
+        self.send_response(status)
+        self.send_header('ETag', site.etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body if cut is None else body[:cut])
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    site = Site(os.urandom(5 * SEGMENT_SIZE + 123), '"v1"')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.site = site
+    site.url = f'http://127.0.0.1:{server.server_address[1]}/hospital_data.csv'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+def download(site, dest, workers, retries=0):
+    return download_file(site.url, str(dest), workers=workers, segment_size=SEGMENT_SIZE, retries=retries,
+                         log=lambda message: None)
+
+
+def interrupt(site, dest, workers):
+    """Start a download that loses its connection part-way, leaving a part file"""
+    site.cut_after = SEGMENT_SIZE // 2
+    with pytest.raises(DownloadError):
+        download(site, dest, workers)
+    assert os.path.exists(f'{dest}.part') and os.path.exists(f'{dest}.part.json')
+    site.requests.clear()
+
+
+def assert_complete(site, dest):
+    with open(dest, 'rb') as f:
+        assert f.read() == site.data
+    assert not os.path.exists(f'{dest}.part') and not os.path.exists(f'{dest}.part.json')
+    assert all(status != 416 for _, status in site.requests)
+
+
+def test_interrupted_stream_resumes(site, tmp_path):
+    dest = tmp_path / 'hospital_data.csv'
+    interrupt(site, dest, workers=1)
+    kept = os.path.getsize(f'{dest}.part')
+    assert 0 < kept < len(site.data)
+    download(site, dest, workers=1)
+    assert site.requests[-1] == (f'bytes={kept}-', 206)
+    assert_complete(site, dest)
+
+
+def test_changed_file_is_not_resumed(site, tmp_path):
+    dest = tmp_path / 'hospital_data.csv'
+    interrupt(site, dest, workers=1)
+    site.data, site.etag = os.urandom(len(site.data) + 10), '"v2"'
+    download(site, dest, workers=1)
+    assert site.requests[-1] == (None, 200)
+    assert_complete(site, dest)
+
+
+def test_stream_discards_preallocated_part(site, tmp_path):
+    dest = tmp_path / 'hospital_data.csv'
+    interrupt(site, dest, workers=2)
+    # The ranged attempt left a full-size part file with holes
+    assert os.path.getsize(f'{dest}.part') == len(site.data)
+    download(site, dest, workers=1)
+    assert site.requests[-1] == (None, 200)
+    assert_complete(site, dest)
+
+
+def test_interrupted_segmented_download_resumes(site, tmp_path):
+    dest = tmp_path / 'hospital_data.csv'
+    interrupt(site, dest, workers=2)
+    download(site, dest, workers=2)
+    segments = [r for r, _ in site.requests if r != 'bytes=0-0']
+    assert 0 < len(segments) < 6
+    assert_complete(site, dest)
+
+
+def test_stream_retries_after_interruption(site, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader.time, 'sleep', lambda seconds: None)
+    dest = tmp_path / 'hospital_data.csv'
+    site.cut_after = SEGMENT_SIZE
+    download(site, dest, workers=1, retries=1)
+    assert site.requests[-1] == (f'bytes={SEGMENT_SIZE}-', 206)
+    assert_complete(site, dest)
@@ -0,0 +1,56 @@
+"""Chunked ingestion matches the one-shot read_csv path, and its memory report starts from read_csv's dtypes"""
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+
+def one_shot(losight, csv_path):
+    """The prepared frame as it was built before chunked ingestion"""
+    data = pd.read_csv(csv_path, low_memory=False)
+    data = data[data['Length of Stay'] > 0].reset_index(drop=True)
+    losight.create_row_features(data)
+    return data
+
+
+@pytest.fixture
+def wide_csv(losight, tmp_path):
+    """The test dataset with a free-text column of one value per row, and a numeric one"""
+    data = pd.read_csv(losight.current_state().csv_file, low_memory=False)
+    data['Notes'] = [f'note {i}' if i % 7 else np.nan for i in range(len(data))]
+    data['Charges'] = np.arange(len(data)) * 1.5
+    path = tmp_path / 'wide.csv'
+    data.to_csv(path, index=False)
+    return str(path)
+
+
+def test_all_columns_match_read_csv(losight, wide_csv, monkeypatch):
+    monkeypatch.setattr(losight, 'CSV_ALL_COLUMNS', True)
+    monkeypatch.setattr(losight, 'CSV_CHUNK_ROWS', 1000)
+    data, _, _ = losight.read_rows(wide_csv)
+    losight.optimize_dtypes(data)
+    expected = one_shot(losight, wide_csv)
+    losight.optimize_dtypes(expected)
+    # Too many distinct values for a categorical
+    assert data['Notes'].dtype == pd.read_csv(wide_csv, usecols=['Notes'])['Notes'].dtype
+    pdt.assert_series_equal(data.dtypes, expected.dtypes)
+    pdt.assert_frame_equal(data, expected)
+
+
+def test_memory_report_starts_from_read_csv_dtypes(losight):
+    state = losight.current_state()
+    baseline = one_shot(losight, state.csv_file)
+    # The DRG features are added after ingestion
+    baseline = baseline[[col for col in state.df.columns if col in baseline.columns]]
+    baseline_bytes = baseline.memory_usage(index=False, deep=True)
+    report = {entry['column']: entry for entry in state.dtype_report['columns']}
+    assert set(report) == set(state.df.columns)
+    for col in baseline.columns:
+        assert report[col]['dtype_before'] == str(baseline[col].dtype), col
+        assert report[col]['bytes_before'] == baseline_bytes[col], col
+        assert report[col]['dtype_after'] == str(state.df[col].dtype), col
+    assert report['Length of Stay']['dtype_before'] == 'int64'
+    assert report['Payment_Type']['dtype_before'] == 'str'
+    assert report['DRG_freq']['dtype_before'] == 'int64'
+    assert state.dtype_report['total_bytes_after'] < state.dtype_report['total_bytes_before'] / 4
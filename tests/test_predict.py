@@ -0,0 +1,43 @@
+"""/api/predict imputes missing fields and rejects values it cannot read"""
+
+import pytest
+
+
+def predict(client, payload):
+    return client.post('/api/predict', json=payload)
+
+
+@pytest.mark.parametrize('body', [
+    '{"severity": "x"}',
+    '{"severity": [1]}',
+    '{"severity": true}',
+    '{"age": "abc"}',
+    '{"drg": {"a": 1}}',
+    '{"drg": 1e400}',
+    '{"age_group": "old"}',
+    '{"age_group": 70}',
+    '{"risk_of_mortality": "Severe"}',
+    '{"payment": ["Medicare"]}',
+    '{"patients": [{"severity": 2}, {"severity": "x"}]}',
+    '{"patients": {"age": [70, 1e400]}}',
+])
+def test_unreadable_values_are_rejected(client, body):
+    response = client.post('/api/predict', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['error']
+
+
+def test_missing_values_are_imputed(client):
+    mean_patient = predict(client, {}).get_json()
+    assert predict(client, {'severity': None, 'age_group': None}).get_json() == mean_patient
+    batch = predict(client, {'patients': [{'severity': 4}, {'age': 80}, {}]}).get_json()
+    assert batch['count'] == 3
+    assert batch['predicted_los'][2] == mean_patient['predicted_los']
+    assert batch['predicted_los'][0] != mean_patient['predicted_los']
+
+
+def test_readable_values_are_used(client):
+    numbers = predict(client, {'severity': 3, 'age': 75, 'drg': 194}).get_json()
+    assert predict(client, {'severity': '3', 'age': 75.0, 'drg': '194'}).get_json() == numbers
+    assert predict(client, {'age_group': '70 or Older', 'risk_of_mortality': 'Major', 'payment': 'Medicare',
+                            'admission': 'Emergency'}).status_code == 200
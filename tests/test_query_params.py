@@ -0,0 +1,93 @@
+"""Malformed query parameters are answered with 400 and an error message, repeated panels once"""
+
+import json
+
+import pytest
+
+
+def assert_bad_request(response):
+    assert response.status_code == 400
+    assert response.get_json()['error']
+
+
+@pytest.mark.parametrize('query', [
+    'bin_width=0',
+    'bin_width=-2',
+    'bin_width=abc',
+    'bin_width=1e-9',
+    'bin_width=nan',
+    'max_los=-5',
+    'max_los=inf',
+    'bins=0',
+    'bins=abc',
+    'bins=2.5',
+    'bins=100000000&log=true',
+    'edges=1,abc',
+    'edges=5',
+    'edges=' + ','.join(map(str, range(2000))),
+])
+def test_histogram_rejects_bad_parameters(client, query):
+    assert_bad_request(client.get(f'/api/data/los-distribution?mode=histogram&{query}'))
+
+
+def test_histogram_rejects_bad_parameters_in_batch(client):
+    assert_bad_request(client.get('/api/data/batch?panels=los-distribution&mode=histogram&bin_width=0'))
+
+
+def test_batch_returns_each_panel_once(client):
+    response = client.get('/api/data/batch?panels=overview,severity,overview,')
+    assert response.status_code == 200
+    keys = [key for key, _ in json.loads(response.data, object_pairs_hook=lambda pairs: pairs)]
+    assert keys == ['overview', 'severity']
+    assert client.get('/api/data/batch?panels=overview,severity').headers['ETag'] == response.headers['ETag']
+
+
+@pytest.mark.parametrize('query, n_bins', [
+    ('bins=1000&max_los=50', 51),
+    ('bin_width=0.5&max_los=50', 101),
+    ('edges=0,5,5,10', 2),
+    ('log=true&bins=1000', 1000),
+])
+def test_histogram_accepts_valid_parameters(client, query, n_bins):
+    response = client.get(f'/api/data/los-distribution?mode=histogram&{query}')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['counts']) == n_bins
+    assert sum(body['counts']) + body['below'] + body['above'] == body['total']
+
+
+@pytest.mark.parametrize('url', [
+    '/api/data/drg-drilldown?drgs=abc',
+    '/api/data/drg-drilldown?drgs=,',
+    '/api/data/drg-drilldown?drgs=194,x',
+    '/api/data/overview?drg=,',
+    '/api/data/overview?drg=abc',
+    '/api/data/batch?drg=1.5',
+    '/api/data/overview?severity=high',
+    '/api/data/overview?los_min=abc&los_max=5',
+])
+def test_filters_reject_bad_values(client, url):
+    assert_bad_request(client.get(url))
+
+
+def test_drg_lists(client, losight):
+    drgs = losight.current_state().filter_index.value_counts('drg').sort_values(ascending=False).index[:2].tolist()
+    query = ','.join(map(str, drgs))
+    overview = client.get(f'/api/data/overview?drg={query},').get_json()
+    single = [client.get(f'/api/data/overview?drg={drg}').get_json()['total_patients'] for drg in drgs]
+    assert overview['total_patients'] == sum(single)
+    profiles = client.get(f'/api/data/drg-drilldown?drgs= {query} ').get_json()['drgs']
+    assert sorted(p['drg_code'] for p in profiles) == sorted(drgs)
+    assert [p['count'] for p in sorted(profiles, key=lambda p: p['drg_code'])] == [n for _, n in sorted(zip(drgs, single))]
+
+
+@pytest.mark.parametrize('seed', ['abc', '-1', '1.5'])
+def test_outliers_reject_bad_seed(client, seed):
+    assert_bad_request(client.get(f'/api/data/outliers?seed={seed}'))
+
+
+def test_outliers_seed_is_reproducible(client, losight):
+    first = client.get('/api/data/outliers?seed=7').get_json()
+    losight.result_cache.clear()
+    assert client.get('/api/data/outliers?seed=7').get_json() == first
+    assert client.get('/api/data/outliers').get_json() == client.get('/api/data/outliers?seed=0').get_json()
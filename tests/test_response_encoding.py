@@ -0,0 +1,59 @@
+"""JSON encoding of responses, and ETags that always name one body"""
+
+import json
+
+import numpy as np
+import pytest
+
+import response_encoding
+
+
+def strict_loads(body):
+    """Parse body as JSON.parse would: NaN and Infinity are errors"""
+    def reject(constant):
+        raise ValueError(f'invalid JSON constant {constant}')
+    return json.loads(body, parse_constant=reject)
+
+
+@pytest.fixture
+def without_orjson(monkeypatch):
+    monkeypatch.setattr(response_encoding, 'orjson', None)
+
+
+def test_fallback_writes_non_finite_numbers_as_null(without_orjson):
+    payload = {'mean': float('nan'), 'values': np.array([1.5, np.inf]), 'max': np.float32('-inf'), 'n': np.int64(3)}
+    assert strict_loads(response_encoding.dumps(payload)) == {'max': None, 'mean': None, 'n': 3, 'values': [1.5, None]}
+
+
+def test_fallback_matches_orjson():
+    if response_encoding.orjson is None:
+        pytest.skip('orjson is not installed')
+    payload = {'b': [1, 2.5, float('nan')], 'a': {'x': np.float64(np.inf), 'y': 'z'}}
+    encoded = response_encoding.dumps(payload)
+    response_encoding.orjson, orjson = None, response_encoding.orjson
+    try:
+        assert response_encoding.dumps(payload) == encoded
+    finally:
+        response_encoding.orjson = orjson
+
+
+def test_empty_selection_batch_is_valid_json(client, without_orjson):
+    # No rows match: every statistic is undefined
+    response = client.get('/api/data/batch?payment=Nope')
+    assert response.status_code == 200
+    body = strict_loads(response.data)
+    assert body['overview']['total_patients'] == 0
+    assert body['overview']['skewness'] is None
+
+
+def test_raw_los_sample_matches_its_etag(client, losight, monkeypatch):
+    # Evicted from the result cache, a result is computed again under the same ETag
+    monkeypatch.setattr(losight, 'LOS_SAMPLE_SIZE', 100)
+    first = client.get('/api/data/los-distribution')
+    losight.result_cache.clear()
+    again = client.get('/api/data/los-distribution')
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert again.data == first.data
+    assert len(first.get_json()['los']) == 100
+    other = client.get('/api/data/los-distribution?seed=1')
+    assert other.headers['ETag'] != first.headers['ETag'] and other.data != first.data
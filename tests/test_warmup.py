@@ -0,0 +1,58 @@
+"""
+Background warm-up computes the panels the dashboard loads.
+
+server.DASHBOARD_PANELS and DASHBOARD_PARAMS mirror TAB_PANELS and
+PANEL_PARAMS in static/app.js, whose fetchPanels() requests
+/api/data/batch?panels=<every tab's panels>&<PANEL_PARAMS>&<filters>; the
+two are kept in sync by hand, and these tests take the server's side.
+"""
+
+import pytest
+
+from warmup import WarmupScheduler
+
+
+def dashboard_url(losight, query):
+    """The batch request the dashboard sends for filters query"""
+    return f"/api/data/batch?panels={','.join(losight.DASHBOARD_PANELS)}&{losight.DASHBOARD_PARAMS}&{query}"
+
+
+@pytest.fixture
+def warmup(losight, monkeypatch):
+    """Enable warm-up (the session runs with LOSIGHT_WARMUP_SECONDS=0) on an empty result cache"""
+    monkeypatch.setattr(losight, 'WARMUP_SECONDS', 30)
+    monkeypatch.setattr(losight, 'warmup_scheduler', WarmupScheduler(2, 30, 30))
+    losight.result_cache.clear()
+    return losight.warmup_scheduler
+
+
+def test_warmup_computes_dashboard_panels_only(losight, warmup, monkeypatch):
+    warmed = []
+    panel_body = losight.panel_body
+
+    def recording_panel_body(panel):
+        warmed.append(panel)
+        return panel_body(panel)
+
+    monkeypatch.setattr(losight, 'panel_body', recording_panel_body)
+    state = losight.current_state()
+    losight.start_warmup(state)
+    warmup.wait()
+
+    progress = warmup.progress()
+    assert progress['state'] == 'done' and progress['failed'] == 0
+    assert set(warmed) == set(losight.DASHBOARD_PANELS) | {'filter-options'}
+    # One task per filter combination warms every dashboard panel for it
+    combinations = len(losight.warmup_plan(state))
+    assert warmed.count('overview') == combinations
+    assert progress['total'] == combinations + 1
+
+
+def test_dashboard_request_is_served_from_warmed_panels(client, losight, warmup):
+    losight.start_warmup(losight.current_state())
+    warmup.wait()
+    hits = losight.result_cache.stats()['hits']
+    response = client.get(dashboard_url(losight, 'severity=2'))
+    assert response.status_code == 200
+    assert list(response.get_json()) == list(losight.DASHBOARD_PANELS)
+    assert losight.result_cache.stats()['hits'] == hits + len(losight.DASHBOARD_PANELS)
@@ -0,0 +1,214 @@
+"""
+Project LOSight: Background warm-up of common filter combinations
+
+After a dataset is loaded, WarmupScheduler computes the results of the
+combinations users are most likely to open (the unfiltered view and every
+single filter value offered by /api/filters/options) on background threads, so
+they are already in the result cache when the first request arrives.
+
+RequestLog counts the filter combinations that are actually requested and
+keeps the counts in a JSON file across restarts; combinations are warmed in
+order of those counts. A run stops at its wall-clock or CPU budget, when
+its stop() check says so (e.g. the result cache is full), or when a newer
+dataset version cancels it.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+# Filter combinations kept in the request log file
+LOG_MAX_ENTRIES = 1000
+
+
+class RequestLog:
+    """Request counts per filter combination, merged into a JSON file on save()"""
+
+    def __init__(self, path=None, save_interval=60.0):
+        self.path = path
+        self.save_interval = save_interval
+        self.counts = Counter(self._read())
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+
+    def _read(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path) as f:
+                counts = json.load(f)
+            return {str(k): int(v) for k, v in counts.items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def record(self, key):
+        """Count one request for key; the log is saved every save_interval seconds"""
+        with self._lock:
+            self.counts[key] += 1
+            self._pending[key] += 1
+            due = self.path and time.monotonic() - self._saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    def save(self):
+        """
+        Add the counts recorded since the last save to the file. Other
+        processes (e.g. Gunicorn workers) sharing the file add theirs too.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._saved_at = time.monotonic()
+        if not pending:
+            return
+        counts = Counter(self._read())
+        counts.update(pending)
+        counts = Counter(dict(counts.most_common(LOG_MAX_ENTRIES)))
+        tmp_path = f'{self.path}.tmp-{os.getpid()}'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(counts, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"✗ Could not save request log: {e}")
+            return
+        with self._lock:
+            self.counts = counts + self._pending
+
+    def top(self, n=None):
+        """The n most requested keys with their counts"""
+        with self._lock:
+            return self.counts.most_common(n)
+
+
+class WarmupRun:
+    """Progress of one warm-up pass over a list of tasks"""
+
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.cpu_seconds = 0.0
+        self.state = 'running'
+        self.reason = None
+        self.started = time.time()
+        self.finished = None
+        self.cancelled = threading.Event()
+
+    def finish(self, state, reason=None):
+        if self.state == 'running':
+            self.state = state
+            self.reason = reason
+            self.finished = time.time()
+
+    def progress(self):
+        end = self.finished or time.time()
+        return {
+            'label': self.label,
+            'state': self.state,
+            'reason': self.reason,
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'percent': round(100.0 * (self.done + self.failed) / self.total, 1) if self.total else 100.0,
+            'elapsed_seconds': round(end - self.started, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+        }
+
+
+class WarmupScheduler:
+    """
+    Runs warm-up tasks (callables, highest priority first) on a few daemon
+    threads within a wall-clock and CPU-time budget. Starting a run cancels
+    the previous one.
+    """
+
+    def __init__(self, workers=2, budget_seconds=60.0, cpu_budget_seconds=60.0):
+        self.workers = workers
+        self.budget_seconds = budget_seconds
+        self.cpu_budget_seconds = cpu_budget_seconds
+        self.run = None
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self, label, tasks, stop=None):
+        """Warm tasks in order; stop() returning a reason ends the run early"""
+        with self._lock:
+            if self.run is not None:
+                self.run.cancelled.set()
+            run = self.run = WarmupRun(label, len(tasks))
+            pending = iter(tasks)
+            deadline = time.monotonic() + self.budget_seconds
+            n_threads = min(self.workers, len(tasks))
+            if not n_threads:
+                run.finish('done')
+            running = [n_threads]
+            self._threads = [
+                threading.Thread(target=self._work, args=(run, pending, deadline, stop, running),
+                                 name=f'losight-warmup-{i}', daemon=True)
+                for i in range(n_threads)
+            ]
+            for thread in self._threads:
+                thread.start()
+            return run
+
+    def _stop_reason(self, run, deadline, stop):
+        if run.cancelled.is_set():
+            return 'cancelled'
+        if time.monotonic() > deadline:
+            return 'time budget'
+        if run.cpu_seconds > self.cpu_budget_seconds:
+            return 'CPU budget'
+        return stop() if stop is not None else None
+
+    def _work(self, run, pending, deadline, stop, running):
+        try:
+            while True:
+                with self._lock:
+                    task = next(pending, None)
+                if task is None:
+                    break
+                reason = self._stop_reason(run, deadline, stop)
+                if reason:
+                    with self._lock:
+                        # Skip this task and every one still queued
+                        run.skipped += 1 + sum(1 for _ in pending)
+                        run.finish('cancelled' if reason == 'cancelled' else 'stopped', reason)
+                    break
+                started = time.thread_time()
+                try:
+                    task()
+                    ok = True
+                except Exception as e:
+                    ok = False
+                    print(f"✗ Warm-up task failed: {type(e).__name__}: {e}")
+                with self._lock:
+                    run.cpu_seconds += time.thread_time() - started
+                    if ok:
+                        run.done += 1
+                    else:
+                        run.failed += 1
+        finally:
+            with self._lock:
+                running[0] -= 1
+                if not running[0]:
+                    run.finish('done')
+
+    def wait(self):
+        """Block until the current run has finished"""
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join()
+
+    def progress(self):
+        with self._lock:
+            return self.run.progress() if self.run is not None else None